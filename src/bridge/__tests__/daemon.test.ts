@@ -1,7 +1,7 @@
 import * as E from 'fp-ts/Either'
 import * as fs from 'fs/promises'
 import * as path from 'path'
-import { startDaemon, cleanupOrphanedSlots, stripBotMention } from '../daemon'
+import { startDaemon, cleanupOrphanedSlots, stripBotMention, rememberProcessedStop } from '../daemon'
 import { State, Slot } from '../../types/state'
 import { sessionStart, heartbeat, sessionEnd, message, stopEvent, keepAlive, permissionRequest } from '../../types/events'
 import { openDatabase, getDatabase, closeDatabase } from '../../services/db'
@@ -800,6 +800,125 @@ describe('permission batching', () => {
     // Restore mock
     telegram.sendButtonsToTopic = () => () => Promise.resolve(E.right({ ok: true, result: { message_id: 3 } }))
   })
+
+  describe('adaptive window', () => {
+    const sendTimes: number[] = []
+    const sentTexts: string[] = []
+    let telegram: any
+
+    const insertRequest = (id: string): void => {
+      const dbResult = getDatabase()
+      if (E.isLeft(dbResult)) throw new Error('Database not opened')
+      const event = permissionRequest(id, 'Bash', `echo ${id}`, 1, batchSessionId)
+      insertEvent(dbResult.right, id, batchSessionId, 'PermissionRequest', JSON.stringify(event))
+    }
+
+    /** Insert requests every intervalMs for durationMs; returns when done */
+    const burst = async (prefix: string, intervalMs: number, durationMs: number): Promise<number> => {
+      const startedAt = Date.now()
+      let count = 0
+      while (Date.now() - startedAt < durationMs) {
+        insertRequest(`${prefix}-${count++}`)
+        await new Promise(resolve => setTimeout(resolve, intervalMs))
+      }
+      return count
+    }
+
+    beforeEach(() => {
+      sendTimes.length = 0
+      sentTexts.length = 0
+      telegram = jest.requireMock('../../services/telegram')
+      const record = (_token: string, _chatId: string, text: string) => {
+        sendTimes.push(Date.now())
+        sentTexts.push(text)
+        return () => Promise.resolve(E.right({ ok: true, result: { message_id: 5 } }))
+      }
+      telegram.sendButtonsToTopic = jest.fn(record)
+      telegram.sendMultiRowButtonsToTopic = jest.fn(record)
+    })
+
+    afterEach(() => {
+      telegram.sendButtonsToTopic = () => () => Promise.resolve(E.right({ ok: true, result: { message_id: 3 } }))
+      telegram.sendMultiRowButtonsToTopic = () => () => Promise.resolve(E.right({ ok: true, result: { message_id: 4 } }))
+    })
+
+    it('keeps a batch open while requests keep arriving', async () => {
+      const configPath = await createBatchConfigFile(batchTempDir, { permissionBatchWindowMs: 300 })
+      openDbForDir(batchTempDir)
+      seedSessionInDb(batchSessionId, 1, 'test', { threadId: 100 })
+
+      const result = await startDaemon(configPath)()
+      expect(E.isRight(result)).toBe(true)
+
+      if (E.isRight(result)) {
+        // ~1.2s of requests 150ms apart — well past the 300ms base window
+        const count = await burst('req-burst', 150, 1200)
+        await new Promise(resolve => setTimeout(resolve, 2000))
+
+        expect(sentTexts).toHaveLength(1)
+        expect(sentTexts[0]).toContain(`${count} permission requests`)
+
+        const stopResult = await result.right()()
+        expect(E.isRight(stopResult)).toBe(true)
+      }
+    })
+
+    it('flushes a continuous burst once the 8s cap is reached', async () => {
+      const configPath = await createBatchConfigFile(batchTempDir, { permissionBatchWindowMs: 300 })
+      openDbForDir(batchTempDir)
+      seedSessionInDb(batchSessionId, 1, 'test', { threadId: 100 })
+
+      const result = await startDaemon(configPath)()
+      expect(E.isRight(result)).toBe(true)
+
+      if (E.isRight(result)) {
+        const burstStartedAt = Date.now()
+        await burst('req-cap', 150, 9500)
+        await new Promise(resolve => setTimeout(resolve, 2000))
+
+        // First message goes out at the cap, mid-burst; the rest follows later
+        expect(sendTimes.length).toBeGreaterThanOrEqual(2)
+        expect(sendTimes[0]! - burstStartedAt).toBeGreaterThanOrEqual(8000)
+        expect(sendTimes[0]! - burstStartedAt).toBeLessThan(9000)
+
+        const stopResult = await result.right()()
+        expect(E.isRight(stopResult)).toBe(true)
+      }
+    }, 20000)
+
+    it('flushes a lone request at the base window', async () => {
+      const configPath = await createBatchConfigFile(batchTempDir, { permissionBatchWindowMs: 100 })
+      openDbForDir(batchTempDir)
+      seedSessionInDb(batchSessionId, 1, 'test', { threadId: 100 })
+
+      const result = await startDaemon(configPath)()
+      expect(E.isRight(result)).toBe(true)
+
+      if (E.isRight(result)) {
+        const dbResult = getDatabase()
+        if (E.isLeft(dbResult)) throw new Error('Database not opened')
+
+        // Heartbeats keep the loop iterating more often than its 1s fallback tick
+        let beats = 0
+        const beat = setInterval(() => {
+          const id = `hb-${beats++}`
+          insertEvent(dbResult.right, id, batchSessionId, 'Heartbeat', JSON.stringify(heartbeat(1, batchSessionId)))
+        }, 50)
+
+        const insertedAt = Date.now()
+        insertRequest('req-lone')
+        await new Promise(resolve => setTimeout(resolve, 1000))
+        clearInterval(beat)
+
+        // Not held for the 500ms burst gap, which is longer than the window
+        expect(sendTimes).toHaveLength(1)
+        expect(sendTimes[0]! - insertedAt).toBeLessThan(400)
+
+        const stopResult = await result.right()()
+        expect(E.isRight(stopResult)).toBe(true)
+      }
+    })
+  })
 })
 
 // ============================================================================
@@ -924,6 +1043,379 @@ describe('session trust via callback', () => {
     // Restore mocks
     poller.pollTelegram = () => () => Promise.resolve(E.right({ updates: [], nextOffset: 0 }))
   }, 15000)
+
+  it('auto-approves a buffered request when the session is trusted before the flush', async () => {
+    const configPath = path.join(trustTempDir, 'config.json')
+    const config = {
+      telegramBotToken: 'test-token',
+      telegramGroupId: 123456,
+      ipcBaseDir: trustTempDir,
+      sessionTimeout: 5 * 60 * 1000,
+      permissionBatchWindowMs: 2500, // Long enough to trust mid-batch
+    }
+    await fs.mkdir(trustTempDir, { recursive: true })
+    await fs.writeFile(configPath, JSON.stringify(config, null, 2))
+
+    openDbForDir(trustTempDir)
+    seedSessionInDb(trustSessionId, 1, 'test', { threadId: 200 })
+
+    // Spy on both keyboard sends
+    const telegram = jest.requireMock('../../services/telegram')
+    const singleRowSpy = jest.fn(() => () => Promise.resolve(E.right({ ok: true, result: { message_id: 3 } })))
+    const multiRowSpy = jest.fn(() => () => Promise.resolve(E.right({ ok: true, result: { message_id: 4 } })))
+    telegram.sendButtonsToTopic = singleRowSpy
+    telegram.sendMultiRowButtonsToTopic = multiRowSpy
+
+    // Trust arrives on the 2nd poll (~1s in), after the request is buffered
+    const poller = jest.requireMock('../../services/telegram-poller')
+    let pollCallCount = 0
+    poller.pollTelegram = () => () => {
+      pollCallCount++
+      const updates = pollCallCount === 2
+        ? [{
+            update_id: 1,
+            callback_query: {
+              id: 'cq-mid',
+              data: `trust:${trustSessionId}`,
+              message: { message_id: 12, chat: { id: 123456 }, message_thread_id: 200 }
+            }
+          }]
+        : []
+      return Promise.resolve(E.right({ updates, nextOffset: pollCallCount }))
+    }
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      const dbResult = getDatabase()
+      if (E.isLeft(dbResult)) throw new Error('Database not opened')
+      const event = permissionRequest('req-mid-1', 'Bash', 'npm test', 1, trustSessionId)
+      insertEvent(dbResult.right, 'req-mid-1', trustSessionId, 'PermissionRequest', JSON.stringify(event))
+
+      // Past the batch window (2.5s) plus a daemon tick
+      await new Promise((resolve) => setTimeout(resolve, 4500))
+
+      // Approved by writeResponses at flush time, without ever showing a keyboard
+      const responseResult = findUnreadResponse(dbResult.right, 'req-mid-1')
+      expect(E.isRight(responseResult) && responseResult.right !== null).toBe(true)
+      if (E.isRight(responseResult) && responseResult.right) {
+        expect(JSON.parse(responseResult.right.payload).approved).toBe(true)
+      }
+      expect(singleRowSpy).not.toHaveBeenCalled()
+      expect(multiRowSpy).not.toHaveBeenCalled()
+
+      const stopResult = await result.right()()
+      expect(E.isRight(stopResult)).toBe(true)
+    }
+
+    // Restore mocks
+    telegram.sendButtonsToTopic = () => () => Promise.resolve(E.right({ ok: true, result: { message_id: 3 } }))
+    telegram.sendMultiRowButtonsToTopic = () => () => Promise.resolve(E.right({ ok: true, result: { message_id: 4 } }))
+    poller.pollTelegram = () => () => Promise.resolve(E.right({ updates: [], nextOffset: 0 }))
+  }, 10000)
+})
+
+// ============================================================================
+// Telegram update routing tests
+// ============================================================================
+
+describe('telegram update routing', () => {
+  let routeTempDir: string
+
+  const callbackUpdate = (updateId: number, callbackId: string, data: string) => ({
+    update_id: updateId,
+    callback_query: {
+      id: callbackId,
+      data,
+      message: { message_id: 10, chat: { id: 123456 }, message_thread_id: 400 }
+    }
+  })
+
+  beforeEach(async () => {
+    routeTempDir = path.join('/tmp', 'daemon-route-test-' + Date.now() + '-' + Math.random().toString(36).slice(2))
+    await fs.rm(routeTempDir, { recursive: true, force: true }).catch(() => {})
+    await fs.mkdir(routeTempDir, { recursive: true })
+  })
+
+  afterEach(async () => {
+    await new Promise(resolve => setTimeout(resolve, 200))
+    closeDatabase()
+    await fs.rm(routeTempDir, { recursive: true, force: true }).catch(() => {})
+
+    // Restore mocks
+    const telegram = jest.requireMock('../../services/telegram')
+    const poller = jest.requireMock('../../services/telegram-poller')
+    telegram.answerCallbackQuery = () => () => Promise.resolve(E.right({ ok: true }))
+    poller.pollTelegram = () => () => Promise.resolve(E.right({ updates: [], nextOffset: 0 }))
+  })
+
+  /** Serve the given batches on successive polls, then empty polls */
+  const servePolls = (batches: unknown[][]): void => {
+    const poller = jest.requireMock('../../services/telegram-poller')
+    let pollCount = 0
+    poller.pollTelegram = () => () => {
+      const updates = batches[pollCount] ?? []
+      pollCount++
+      return Promise.resolve(E.right({ updates, nextOffset: pollCount }))
+    }
+  }
+
+  const spyOnCallbackAnswers = (): jest.Mock => {
+    const telegram = jest.requireMock('../../services/telegram')
+    const answerSpy = jest.fn((_token: string, _callbackId: string, _text?: string) =>
+      () => Promise.resolve(E.right({ ok: true })))
+    telegram.answerCallbackQuery = answerSpy
+    return answerSpy
+  }
+
+  it('routes updates received by the poll loop to their handlers', async () => {
+    const configPath = await createTestConfigFile(routeTempDir)
+    openDbForDir(routeTempDir)
+    seedSessionInDb('route-session-1', 1, 'test', { threadId: 400 })
+    servePolls([[], [callbackUpdate(1, 'cq-route', 'approve:req-route')]])
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      const dbResult = getDatabase()
+      if (E.isLeft(dbResult)) throw new Error('Database not opened')
+      const event = permissionRequest('req-route', 'Bash', 'ls', 1, 'route-session-1')
+      insertEvent(dbResult.right, 'req-route', 'route-session-1', 'PermissionRequest', JSON.stringify(event))
+
+      await new Promise(resolve => setTimeout(resolve, 2500))
+
+      const responseResult = findUnreadResponse(dbResult.right, 'req-route')
+      expect(E.isRight(responseResult) && responseResult.right !== null).toBe(true)
+      if (E.isRight(responseResult) && responseResult.right) {
+        expect(JSON.parse(responseResult.right.payload).approved).toBe(true)
+      }
+
+      const stopResult = await result.right()()
+      expect(E.isRight(stopResult)).toBe(true)
+    }
+  })
+
+  it('routes updates queued while the daemon is stopping', async () => {
+    const configPath = await createTestConfigFile(routeTempDir)
+    const answerSpy = spyOnCallbackAnswers()
+
+    // Stop is requested while the poll returning the batch is in flight,
+    // so the main loop has already exited when the batch is queued
+    let stopDaemon: (() => Promise<unknown>) | undefined
+    let stopped: Promise<unknown> | undefined
+    let pollCount = 0
+    const poller = jest.requireMock('../../services/telegram-poller')
+    poller.pollTelegram = () => () => {
+      pollCount++
+      if (pollCount === 2 && stopDaemon) {
+        stopped = stopDaemon()
+        return Promise.resolve(E.right({ updates: [callbackUpdate(1, 'cq-late', 'approve:req-late')], nextOffset: 2 }))
+      }
+      return Promise.resolve(E.right({ updates: [], nextOffset: pollCount }))
+    }
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      const stopFunction = result.right
+      stopDaemon = () => stopFunction()()
+      await new Promise(resolve => setTimeout(resolve, 2000))
+
+      expect(stopped).toBeDefined()
+      const stopResult = await stopped
+      expect(E.isRight(stopResult as E.Either<unknown, void>)).toBe(true)
+      expect(answerSpy.mock.calls.map(call => call[1])).toEqual(['cq-late'])
+    }
+  })
+
+  it('stop aborts an in-flight long-poll', async () => {
+    const configPath = await createTestConfigFile(routeTempDir)
+
+    // Long-poll that only returns once its signal is aborted
+    let pollSignal: AbortSignal | undefined
+    const poller = jest.requireMock('../../services/telegram-poller')
+    poller.pollTelegram = (_config: unknown, _offset: number, _timeout: number, signal: AbortSignal) => () => {
+      pollSignal = signal
+      return new Promise(resolve => {
+        signal.addEventListener('abort', () => resolve(E.left(poller.pollerError('aborted'))), { once: true })
+      })
+    }
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      await new Promise(resolve => setTimeout(resolve, 200))
+      expect(pollSignal?.aborted).toBe(false)
+
+      const startedAt = Date.now()
+      const stopResult = await result.right()()
+      expect(E.isRight(stopResult)).toBe(true)
+      expect(pollSignal?.aborted).toBe(true)
+      expect(Date.now() - startedAt).toBeLessThan(1000)
+    }
+  })
+
+  /** Start and stop a daemon with the given pollTimeoutSeconds; returns the first long-poll timeout */
+  const firstPollTimeout = async (pollTimeoutSeconds: number): Promise<number | undefined> => {
+    const configPath = await createTestConfigFile(routeTempDir)
+    const config = JSON.parse(await fs.readFile(configPath, 'utf-8'))
+    await fs.writeFile(configPath, JSON.stringify({ ...config, pollTimeoutSeconds }))
+
+    const timeouts: number[] = []
+    const poller = jest.requireMock('../../services/telegram-poller')
+    poller.pollTelegram = (_config: unknown, _offset: number, timeout: number) => () => {
+      timeouts.push(timeout)
+      return Promise.resolve(E.right({ updates: [], nextOffset: 0 }))
+    }
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+    if (E.isRight(result)) {
+      await new Promise(resolve => setTimeout(resolve, 100))
+      await result.right()()
+    }
+    return timeouts[0]
+  }
+
+  it('passes the configured long-poll timeout to pollTelegram', async () => {
+    expect(await firstPollTimeout(25)).toBe(25)
+  })
+
+  it('clamps an out-of-range long-poll timeout', async () => {
+    expect(await firstPollTimeout(0)).toBe(1)
+    expect(await firstPollTimeout(600)).toBe(50)
+  })
+
+  it('backs off for a second after a poll error', async () => {
+    const configPath = await createTestConfigFile(routeTempDir)
+
+    const pollTimes: number[] = []
+    const poller = jest.requireMock('../../services/telegram-poller')
+    poller.pollTelegram = () => () => {
+      pollTimes.push(Date.now())
+      return Promise.resolve(E.left(poller.pollerError('network down')))
+    }
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      await new Promise(resolve => setTimeout(resolve, 2500))
+      const stopResult = await result.right()()
+      expect(E.isRight(stopResult)).toBe(true)
+
+      // ~1s apart: 3 polls in 2.5s, not a tight retry loop
+      expect(pollTimes.length).toBeGreaterThanOrEqual(2)
+      expect(pollTimes.length).toBeLessThanOrEqual(4)
+      for (let i = 1; i < pollTimes.length; i++) {
+        expect(pollTimes[i]! - pollTimes[i - 1]!).toBeGreaterThanOrEqual(950)
+      }
+    }
+  })
+
+  it('does not wait on answers to unknown or expired callbacks', async () => {
+    const configPath = await createTestConfigFile(routeTempDir)
+
+    // Answers take 2s to complete; routing must not sit behind them
+    const requestedAt = new Map<string, number>()
+    const telegram = jest.requireMock('../../services/telegram')
+    telegram.answerCallbackQuery = (_token: string, callbackId: string) => {
+      requestedAt.set(callbackId, Date.now())
+      return () => new Promise(resolve => setTimeout(() => resolve(E.right({ ok: true })), 2000))
+    }
+    servePolls([
+      [callbackUpdate(1, 'cq-unknown', 'bogus:1'), callbackUpdate(2, 'cq-expired', 'batch_approve:b-gone')],
+      [callbackUpdate(3, 'cq-next', 'approve:req-next')]
+    ])
+
+    const startedAt = Date.now()
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      await new Promise(resolve => setTimeout(resolve, 1000))
+
+      expect([...requestedAt.keys()]).toEqual(['cq-unknown', 'cq-expired', 'cq-next'])
+      expect(requestedAt.get('cq-next')! - startedAt).toBeLessThan(1000)
+
+      const stopResult = await result.right()()
+      expect(E.isRight(stopResult)).toBe(true)
+    }
+  }, 10000)
+
+  it('routes an update delivered twice only once', async () => {
+    const configPath = await createTestConfigFile(routeTempDir)
+    const answerSpy = spyOnCallbackAnswers()
+    const update = callbackUpdate(7, 'cq-dup', 'approve:req-dup')
+    servePolls([[update], [update]])
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      await new Promise(resolve => setTimeout(resolve, 2500))
+
+      const answered = answerSpy.mock.calls.map(call => call[1])
+      expect(answered).toEqual(['cq-dup'])
+
+      const stopResult = await result.right()()
+      expect(E.isRight(stopResult)).toBe(true)
+    }
+  })
+
+  it('does not poll again (acknowledging a batch) until the batch is routed', async () => {
+    const configPath = await createTestConfigFile(routeTempDir)
+    const answerSpy = spyOnCallbackAnswers()
+
+    // Record, at each poll, how many callbacks had been answered
+    const answeredAtPoll: number[] = []
+    const poller = jest.requireMock('../../services/telegram-poller')
+    poller.pollTelegram = () => () => {
+      answeredAtPoll.push(answerSpy.mock.calls.length)
+      const updates = answeredAtPoll.length === 1 ? [callbackUpdate(1, 'cq-ack', 'approve:req-ack')] : []
+      return Promise.resolve(E.right({ updates, nextOffset: answeredAtPoll.length }))
+    }
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      await new Promise(resolve => setTimeout(resolve, 1500))
+
+      expect(answeredAtPoll.length).toBeGreaterThan(1)
+      expect(answeredAtPoll[1]).toBe(1)
+
+      const stopResult = await result.right()()
+      expect(E.isRight(stopResult)).toBe(true)
+    }
+  })
+
+  it('routes an update whose id is lower than one already routed', async () => {
+    const configPath = await createTestConfigFile(routeTempDir)
+    const answerSpy = spyOnCallbackAnswers()
+    // Telegram restarts update_id at a random value after a week without updates
+    servePolls([
+      [callbackUpdate(900000, 'cq-high', 'approve:req-high')],
+      [callbackUpdate(5, 'cq-low', 'approve:req-low')]
+    ])
+
+    const result = await startDaemon(configPath)()
+    expect(E.isRight(result)).toBe(true)
+
+    if (E.isRight(result)) {
+      await new Promise(resolve => setTimeout(resolve, 2500))
+
+      const answered = answerSpy.mock.calls.map(call => call[1])
+      expect(answered).toEqual(['cq-high', 'cq-low'])
+
+      const stopResult = await result.right()()
+      expect(E.isRight(stopResult)).toBe(true)
+    }
+  })
 })
 
 // ============================================================================
@@ -1255,3 +1747,24 @@ describe('stripBotMention', () => {
     expect(stripBotMention('')).toBe('')
   })
 })
+
+describe('rememberProcessedStop', () => {
+  it('reports a Stop event id only once', () => {
+    const processed = new Set<string>()
+    expect(rememberProcessedStop(processed, 'stop-1')).toBe(true)
+    expect(rememberProcessedStop(processed, 'stop-1')).toBe(false)
+  })
+
+  it('evicts the oldest id once past the limit and still de-duplicates recent ones', () => {
+    const processed = new Set<string>()
+    for (let i = 0; i <= 4096; i++) {
+      rememberProcessedStop(processed, `stop-${i}`)
+    }
+
+    expect(processed.size).toBe(4096)
+    expect(processed.has('stop-0')).toBe(false)
+    expect(rememberProcessedStop(processed, 'stop-4096')).toBe(false)
+    expect(rememberProcessedStop(processed, 'stop-1')).toBe(false)
+    expect(rememberProcessedStop(processed, 'stop-0')).toBe(true)
+  })
+})
@@ -3,7 +3,7 @@
 import * as TE from 'fp-ts/TaskEither'
 import * as E from 'fp-ts/Either'
 import * as path from 'path'
-import * as fs from 'fs/promises'
+import { setTimeout as delay } from 'timers/promises'
 import { Config } from '../types/config'
 import { State, Slot, PendingStop, initialState } from '../types/state'
 import { IpcEvent } from '../types/events'
@@ -18,12 +18,13 @@ import {
   removePendingStop,
   findPendingStopBySlot,
   updatePendingStopMessageId,
+  findSlotByThreadId,
   StateError
 } from '../core/state'
 import { loadState } from '../services/state-persistence-sqlite'
-import { readAllUnprocessedEvents, markEventDone, writeResponse } from '../services/ipc-sqlite'
-import { openDatabase, closeDatabase, getDatabase } from '../services/db'
-import { listActiveSessions, updateSessionThreadId, insertKnownTopic, insertPendingStop as dbInsertPendingStop, deletePendingStop as dbDeletePendingStop } from '../services/db-queries'
+import { readAllUnprocessedEvents, readEventsChangeStamp, markEventDone, writeResponse, writeResponses } from '../services/ipc-sqlite'
+import { openDatabase, closeDatabase, getDatabase, isDatabaseReplaced } from '../services/db'
+import { listSessionIds, updateSessionThreadId, insertKnownTopic, insertPendingStop as dbInsertPendingStop, deletePendingStop as dbDeletePendingStop } from '../services/db-queries'
 import {
   createForumTopic,
   deleteForumTopic,
@@ -36,6 +37,9 @@ import {
   TelegramApiResponse,
 } from '../services/telegram'
 import { pollTelegram, TelegramUpdate } from '../services/telegram-poller'
+import { createIpcWatcher } from '../services/ipc-watcher'
+import { createSendQueue, type SendQueue } from '../services/send-queue'
+import { writeDaemonHeartbeat } from '../services/daemon-health'
 
 /**
  * Daemon error type - all errors that can occur during daemon operation
@@ -64,27 +68,41 @@ interface PendingBatchInfo {
   readonly sessionId: string
 }
 
+/** Per-session trust bookkeeping (approval count toward the threshold, trust flag) */
+interface SessionTrust {
+  approvals: number
+  trusted: boolean
+}
+
 /**
  * Non-persisted daemon runtime state
  */
 interface DaemonRuntime {
   telegramOffset: number
-  /** Track which pending stops have already had their Telegram side effects run */
+  /** Recently routed update keys (update_id and callback_query.id), bounded, oldest evicted */
+  recentUpdateKeys: Set<string>
+  /** Database change stamp at the last complete events scan (null = never scanned) */
+  eventsChangeStamp: string | null
+  /** Updates received by the poll loop, waiting to be routed by the main loop */
+  updateQueue: TelegramUpdate[]
+  /** Releases the poll loop once the queued updates are routed (null when it is not waiting) */
+  updatesRouted: (() => void) | null
+  /** Track which pending stops have already had their Telegram side effects run (bounded, oldest evicted) */
   processedStopEvents: Set<string>
-  /** Per-slot typing indicator: slotNum → true when Claude is processing */
-  typingSlots: Map<number, boolean>
-  /** Per-slot last typing action timestamp (Telegram expires after 5s) */
-  typingLastSent: Map<number, number>
+  /** Slots where Claude is processing: slotNum → last typing action timestamp (0 = due) */
+  typingSlots: Map<number, number>
   /** Per-slot permission batch buffer (slotNum → entries) */
   permissionBatches: Map<number, PermissionBatchEntry[]>
   /** Flushed batch lookups (batchId → request info) */
   pendingBatches: Map<string, PendingBatchInfo>
-  /** Per-session approval count for trust threshold */
-  approvalCounts: Map<string, number>
-  /** Sessions that have been trusted (auto-approve all future requests) */
-  trustedSessions: Set<string>
+  /** Last issued batch sequence number (seeded from the start time, so ids stay unique across restarts) */
+  batchSeq: number
+  /** Per-session approval count and trust flag */
+  sessionTrust: Map<string, SessionTrust>
   /** Per-slot queued instructions (message arrived before Stop event) */
   queuedInstructions: Map<number, string>
+  /** Outbound Telegram sends, ordered per topic (threadId) */
+  sendQueue: SendQueue
 }
 
 // ============================================================================
@@ -145,6 +163,25 @@ const processEvent = (
 // Telegram side effects
 // ============================================================================
 
+/** Stop event ids remembered for de-duplication before the oldest are evicted */
+const PROCESSED_STOP_EVENTS_LIMIT = 4096
+
+/**
+ * Record a Stop event as handled; returns false if it already was. Sets
+ * iterate in insertion order, so the first entry is always the oldest —
+ * dropping it keeps memory bounded over long uptimes while still covering
+ * any realistic re-delivery window.
+ */
+export const rememberProcessedStop = (processed: Set<string>, eventId: string): boolean => {
+  if (processed.has(eventId)) return false
+  processed.add(eventId)
+  if (processed.size > PROCESSED_STOP_EVENTS_LIMIT) {
+    const oldest = processed.values().next()
+    if (!oldest.done) processed.delete(oldest.value)
+  }
+  return true
+}
+
 /**
  * Process Telegram side effects for an IPC event.
  * Called after pure processEvent() — handles topic creation, messages, buttons.
@@ -165,16 +202,19 @@ const processEventSideEffects = async (
 
       // If slot already has a threadId (reattachment), send activation message to existing topic
       if (slot.threadId) {
-        await sendMessageToTopic(
+        runtime.sendQueue.enqueue(slot.threadId, sendMessageToTopic(
           token, chatId,
           `🟢 S${event.slotNum} reactivated — ${slot.projectName}`,
           slot.threadId
-        )()
+        ))
         return state
       }
 
-      // Create new forum topic
-      const topicResult = await createForumTopic(token, chatId, slot.topicName)()
+      // Create new forum topic. Awaited: the threadId is needed below. There is
+      // no thread yet to key on, so topic creation is ordered per slot
+      const topicResult = await runtime.sendQueue.run(
+        `topic:${event.slotNum}`, createForumTopic(token, chatId, slot.topicName)
+      )
       if (E.isRight(topicResult)) {
         const result = topicResult.right.result as { message_thread_id: number } | undefined
         if (result?.message_thread_id) {
@@ -194,11 +234,11 @@ const processEventSideEffects = async (
           }
 
           // Send activation message
-          await sendMessageToTopic(
+          runtime.sendQueue.enqueue(threadId, sendMessageToTopic(
             token, chatId,
             `🟢 ${slot.projectName}`,
             threadId
-          )()
+          ))
 
           return updatedState
         }
@@ -223,7 +263,7 @@ const processEventSideEffects = async (
       if (!slot?.threadId) return state
 
       // Trusted session → auto-approve immediately
-      if (slot.sessionId && runtime.trustedSessions.has(slot.sessionId)) {
+      if (slot.sessionId && runtime.sessionTrust.get(slot.sessionId)?.trusted) {
         const sessionIpcDir = path.join(config.ipcBaseDir, slot.sessionId)
         const writeResult = await writeResponse(sessionIpcDir, event.requestId, { approved: true })()
         if (E.isLeft(writeResult)) {
@@ -266,8 +306,7 @@ const processEventSideEffects = async (
       if (!slot?.threadId) return state
 
       // Don't re-process stops we've already handled
-      if (runtime.processedStopEvents.has(event.eventId)) return state
-      runtime.processedStopEvents.add(event.eventId)
+      if (!rememberProcessedStop(runtime.processedStopEvents, event.eventId)) return state
 
       // Send last message to topic
       const lastMsgPreview = event.lastMessage.length > 1000
@@ -277,7 +316,10 @@ const processEventSideEffects = async (
         ? `${lastMsgPreview}\n\n📝 Reply with next instruction`
         : lastMsgPreview
 
-      const sendResult = await sendMessageToTopic(token, chatId, text, slot.threadId)()
+      // Awaited: the message_id is needed to track the pending stop
+      const sendResult = await runtime.sendQueue.run(
+        slot.threadId, sendMessageToTopic(token, chatId, text, slot.threadId)
+      )
       if (E.isRight(sendResult)) {
         const result = sendResult.right.result as { message_id: number } | undefined
         if (result?.message_id) {
@@ -320,6 +362,15 @@ const processAllEvents = (
     async () => {
       let currentState = state
 
+      // Skip the events query entirely when nothing was written since the
+      // last complete scan. The stamp is taken before reading so a write
+      // landing mid-scan still triggers another pass next tick.
+      const stampResult = await readEventsChangeStamp()()
+      const stamp = E.isRight(stampResult) ? stampResult.right : null
+      if (stamp !== null && stamp === runtime.eventsChangeStamp) {
+        return handleStopEventSideEffects(config, currentState, runtime)
+      }
+
       // Read all unprocessed events from SQLite
       const eventsResult = await readAllUnprocessedEvents()()
       if (E.isLeft(eventsResult)) {
@@ -351,19 +402,20 @@ const processAllEvents = (
           // For SessionEnd, we need the slot from pre-removal state
           const slot = preEventState.slots[event.slotNum]
           if (slot?.threadId) {
-            await sendMessageToTopic(
+            const threadId = slot.threadId
+            runtime.sendQueue.enqueue(threadId, sendMessageToTopic(
               config.telegramBotToken,
               String(config.telegramGroupId),
               `🔴 S${event.slotNum} deactivated — ${slot.projectName}`,
-              slot.threadId
-            )()
+              threadId
+            ))
 
-            // Delete forum topic
-            await deleteForumTopic(
+            // Delete forum topic (queued behind the message above)
+            runtime.sendQueue.enqueue(threadId, deleteForumTopic(
               config.telegramBotToken,
               String(config.telegramGroupId),
-              slot.threadId
-            )()
+              threadId
+            ))
           }
         } else {
           currentState = await processEventSideEffects(
@@ -374,6 +426,7 @@ const processAllEvents = (
         // Mark event as processed in SQLite
         await markEventDone(eventRowId)()
       }
+      runtime.eventsChangeStamp = stamp
 
       // Handle stop side effects (queued instruction auto-inject)
       currentState = await handleStopEventSideEffects(config, currentState, runtime)
@@ -400,11 +453,13 @@ const handleStopEventSideEffects = async (
 ): Promise<State> => {
   let currentState = state
 
-  for (const ps of Object.values(currentState.pendingStops)) {
-    const sessionIpcDir = getSessionIpcDir(config, currentState, ps.slotNum)
+  // Walk queued instructions (usually none) and look up each slot's pending
+  // stop through the slot index, rather than scanning every pending stop
+  for (const [slotNum, queuedText] of runtime.queuedInstructions) {
+    const ps = findPendingStopBySlot(currentState, slotNum)
+    if (!ps) continue
 
-    // Check for queued instruction in runtime memory
-    const queuedText = runtime.queuedInstructions.get(ps.slotNum)
+    const sessionIpcDir = getSessionIpcDir(config, currentState, ps.slotNum)
 
     if (queuedText) {
       console.log(`[auto-inject] Found queued instruction for slot ${ps.slotNum}, eventId=${ps.eventId.slice(0,8)}: "${queuedText.slice(0,50)}"`)
@@ -427,12 +482,12 @@ const handleStopEventSideEffects = async (
         // Verbose: confirm auto-injection
         const slot = currentState.slots[ps.slotNum]
         if (slot?.verbose && slot.threadId) {
-          await sendMessageToTopic(
+          runtime.sendQueue.enqueue(slot.threadId, sendMessageToTopic(
             config.telegramBotToken,
             String(config.telegramGroupId),
             `📨 Auto-injected queued instruction`,
             slot.threadId
-          )()
+          ))
         }
       }
     }
@@ -461,16 +516,13 @@ const updateTypingIndicators = async (
   const token = config.telegramBotToken
   const chatId = String(config.telegramGroupId)
 
-  for (const [slotNum, isTyping] of runtime.typingSlots) {
-    if (!isTyping) continue
-
+  for (const [slotNum, lastSent] of runtime.typingSlots) {
     const slot = state.slots[slotNum]
     if (!slot?.threadId) continue
 
-    const lastSent = runtime.typingLastSent.get(slotNum) ?? 0
     if (now - lastSent >= TYPING_INTERVAL_MS) {
-      await sendChatAction(token, chatId, 'typing', slot.threadId)()
-      runtime.typingLastSent.set(slotNum, now)
+      runtime.sendQueue.enqueue(slot.threadId, sendChatAction(token, chatId, 'typing', slot.threadId))
+      runtime.typingSlots.set(slotNum, now)
     }
   }
 }
@@ -479,16 +531,15 @@ const updateTypingIndicators = async (
  * Enable typing indicator for a slot (Claude started processing)
  */
 const startTyping = (runtime: DaemonRuntime, slotNum: number): void => {
-  runtime.typingSlots.set(slotNum, true)
-  // Force immediate send on next iteration by clearing last-sent
-  runtime.typingLastSent.delete(slotNum)
+  // Force immediate send on next iteration with a zero last-sent time
+  runtime.typingSlots.set(slotNum, 0)
 }
 
 /**
  * Disable typing indicator for a slot (Claude stopped / waiting)
  */
 const stopTyping = (runtime: DaemonRuntime, slotNum: number): void => {
-  runtime.typingSlots.set(slotNum, false)
+  runtime.typingSlots.delete(slotNum)
 }
 
 // ============================================================================
@@ -497,11 +548,47 @@ const stopTyping = (runtime: DaemonRuntime, slotNum: number): void => {
 
 /** Default batch window in ms */
 const DEFAULT_BATCH_WINDOW_MS = 2000
+/** A request arriving within this gap of the previous one keeps the batch open (capped at the window) */
+const BATCH_BURST_GAP_MS = 500
+/** Upper bound on how long a burst can hold a batch open */
+const MAX_BATCH_WINDOW_MS = 8000
 /** Default approval count before offering trust */
 const DEFAULT_TRUST_THRESHOLD = 3
 
+/**
+ * Auto-approve buffered requests when their session has since been trusted.
+ * All responses are written in one transaction. Returns the entries that
+ * still need a keyboard (all of them if the session is not trusted or the
+ * write failed).
+ */
+const autoApproveIfTrusted = async (
+  config: Config,
+  runtime: DaemonRuntime,
+  entries: readonly PermissionBatchEntry[]
+): Promise<readonly PermissionBatchEntry[]> => {
+  const sessionId = entries[0]?.sessionId
+  if (!sessionId || !runtime.sessionTrust.get(sessionId)?.trusted) return entries
+
+  const sessionIpcDir = path.join(config.ipcBaseDir, sessionId)
+  const requestIds = entries.map(e => e.requestId)
+  const writeResult = await writeResponses(sessionIpcDir, requestIds, { approved: true })()
+  if (E.isLeft(writeResult)) {
+    console.error(`[trust] Failed to write auto-approve responses (${entries.length}): ${String(writeResult.left)}`)
+    return entries
+  }
+
+  startTyping(runtime, entries[0]!.slotNum)
+  console.log(`[trust] Auto-approved ${entries.length} buffered request(s) for trusted session ${sessionId.slice(0,8)}`)
+  return []
+}
+
 /**
  * Flush permission batches whose window has expired.
+ * The window is adaptive: once the base window has passed, a batch that is
+ * still receiving requests (last one within BATCH_BURST_GAP_MS, or the base
+ * window if that is shorter — a lone request must not wait longer) stays open
+ * until the burst pauses or MAX_BATCH_WINDOW_MS is reached, so a rapid run
+ * of tool calls lands in one message instead of several.
  * Single requests → standard [Approve] [Deny] buttons.
  * Multiple requests → combined [Approve All (N)] [Deny All] with per-item rows.
  */
@@ -512,15 +599,22 @@ const flushPermissionBatches = async (
 ): Promise<void> => {
   const now = Date.now()
   const windowMs = config.permissionBatchWindowMs ?? DEFAULT_BATCH_WINDOW_MS
+  const burstGapMs = Math.min(BATCH_BURST_GAP_MS, windowMs)
   const token = config.telegramBotToken
   const chatId = String(config.telegramGroupId)
 
-  for (const [slotNum, entries] of runtime.permissionBatches) {
-    if (entries.length === 0) continue
+  for (const [slotNum, buffered] of runtime.permissionBatches) {
+    if (buffered.length === 0) continue
 
     // Check if the oldest entry has aged past the window
-    const oldest = entries[0]!
-    if (now - oldest.bufferedAt < windowMs) continue
+    const oldest = buffered[0]!
+    const age = now - oldest.bufferedAt
+    if (age < windowMs) continue
+
+    // Still bursting — extend the window up to the cap
+    const newest = buffered[buffered.length - 1]!
+    const bursting = now - newest.bufferedAt <= burstGapMs
+    if (bursting && age < Math.max(windowMs, MAX_BATCH_WINDOW_MS)) continue
 
     // Drain the batch
     runtime.permissionBatches.set(slotNum, [])
@@ -528,6 +622,10 @@ const flushPermissionBatches = async (
     const slot = state.slots[slotNum]
     if (!slot?.threadId) continue
 
+    // Session trusted while these were buffered — approve before building any message
+    const entries = await autoApproveIfTrusted(config, runtime, buffered)
+    if (entries.length === 0) continue
+
     if (entries.length === 1) {
       // Single request — standard format
       const entry = entries[0]!
@@ -540,10 +638,10 @@ const flushPermissionBatches = async (
         { text: '✅ Approve', callback_data: `approve:${entry.requestId}` },
         { text: '❌ Deny', callback_data: `deny:${entry.requestId}` }
       ]
-      await sendButtonsToTopic(token, chatId, text, buttons, slot.threadId)()
+      runtime.sendQueue.enqueue(slot.threadId, sendButtonsToTopic(token, chatId, text, buttons, slot.threadId))
     } else {
       // Multiple requests — batched format
-      const batchId = `b_${Date.now()}_${slotNum}`
+      const batchId = `b${(++runtime.batchSeq).toString(36)}`
       const lines = entries.map(e => {
         const icon = e.tool === 'Bash' ? '🖥️' : '🔧'
         const preview = e.command.length > 80 ? e.command.substring(0, 80) + '...' : e.command
@@ -565,11 +663,25 @@ const flushPermissionBatches = async (
         sessionId: entries[0]!.sessionId
       })
 
-      await sendMultiRowButtonsToTopic(token, chatId, text, buttonRows, slot.threadId)()
+      runtime.sendQueue.enqueue(
+        slot.threadId, sendMultiRowButtonsToTopic(token, chatId, text, buttonRows, slot.threadId)
+      )
     }
   }
 }
 
+/**
+ * Get (or create) the trust record for a session
+ */
+const getSessionTrust = (runtime: DaemonRuntime, sessionId: string): SessionTrust => {
+  let trust = runtime.sessionTrust.get(sessionId)
+  if (!trust) {
+    trust = { approvals: 0, trusted: false }
+    runtime.sessionTrust.set(sessionId, trust)
+  }
+  return trust
+}
+
 /**
  * Track an approval and offer session trust at threshold.
  */
@@ -581,8 +693,8 @@ const trackApproval = async (
   slotNum: number
 ): Promise<void> => {
   const threshold = config.sessionTrustThreshold ?? DEFAULT_TRUST_THRESHOLD
-  const count = (runtime.approvalCounts.get(sessionId) ?? 0) + 1
-  runtime.approvalCounts.set(sessionId, count)
+  const trust = getSessionTrust(runtime, sessionId)
+  const count = ++trust.approvals
 
   if (count === threshold) {
     const slot = state.slots[slotNum]
@@ -594,12 +706,12 @@ const trackApproval = async (
       { text: '🔓 Trust this session', callback_data: `trust:${sessionId}` },
       { text: '👀 Keep reviewing', callback_data: `no_trust:${sessionId}` }
     ]
-    await sendButtonsToTopic(
+    runtime.sendQueue.enqueue(slot.threadId, sendButtonsToTopic(
       token, chatId,
       `You've approved ${count} requests. Trust this session to auto-approve future requests?`,
       buttons,
       slot.threadId
-    )()
+    ))
   }
 }
 
@@ -607,29 +719,20 @@ const trackApproval = async (
 // Telegram polling + message/callback routing
 // ============================================================================
 
-/**
- * Find slot number by matching message_thread_id to slot threadId
- */
-const findSlotByThreadId = (state: State, threadId: number): number | undefined => {
-  for (const [key, slot] of Object.entries(state.slots)) {
-    if (slot && slot.threadId === threadId) {
-      return parseInt(key, 10)
-    }
-  }
-  return undefined
-}
+/** Leading bot command with an @BotName suffix — compiled once at load */
+const BOT_MENTION_PATTERN = /^(\/\w+)@\w+/
 
-/**
- * Process an incoming Telegram message for a specific slot.
- */
 /**
  * Strip @BotName suffix from Telegram bot commands.
  * e.g. "/clear@MyBot" → "/clear", "/compact@Bot_name" → "/compact"
  * Non-command messages pass through unchanged.
  */
 export const stripBotMention = (text: string): string =>
-  text.replace(/^(\/\w+)@\w+/, '$1')
+  text.startsWith('/') ? text.replace(BOT_MENTION_PATTERN, '$1') : text
 
+/**
+ * Process an incoming Telegram message for a specific slot.
+ */
 const processIncomingMessage = async (
   config: Config,
   state: State,
@@ -642,8 +745,7 @@ const processIncomingMessage = async (
   const pendingStop = findPendingStopBySlot(state, slotNum)
 
   const slot = state.slots[slotNum]
-  const allPS = Object.values(state.pendingStops).map(ps => ({ eventId: ps.eventId.slice(0,8), slotNum: ps.slotNum, sessionId: ps.sessionId?.slice(0,8) }))
-  console.log(`[telegram] processIncomingMessage slot=${slotNum}, pendingStops=${JSON.stringify(allPS)}, found=${!!pendingStop}`)
+  console.log(`[telegram] processIncomingMessage slot=${slotNum}, found=${!!pendingStop}`)
 
   // Validate pending stop belongs to this slot's session
   if (pendingStop && pendingStop.sessionId && slot?.sessionId && pendingStop.sessionId !== slot.sessionId) {
@@ -669,12 +771,12 @@ const processIncomingMessage = async (
 
       // Verbose: confirm delivery in topic
       if (slot?.verbose && slot.threadId) {
-        await sendMessageToTopic(
+        runtime.sendQueue.enqueue(slot.threadId, sendMessageToTopic(
           config.telegramBotToken,
           String(config.telegramGroupId),
           `📨 Instruction delivered to S${slotNum}`,
           slot.threadId
-        )()
+        ))
       }
       return removePendingStop(state, pendingStop.eventId)
     }
@@ -687,97 +789,119 @@ const processIncomingMessage = async (
 
   // Verbose: confirm queuing in topic
   if (slot?.verbose && slot.threadId) {
-    await sendMessageToTopic(
+    runtime.sendQueue.enqueue(slot.threadId, sendMessageToTopic(
       config.telegramBotToken,
       String(config.telegramGroupId),
       `📋 Instruction queued (Claude is busy)`,
       slot.threadId
-    )()
+    ))
   }
 
   return state
 }
 
 /**
- * Handle a callback query (permission approve/deny button press)
+ * Inputs shared by every callback action handler
  */
-const handleCallbackQuery = async (
-  config: Config,
-  state: State,
-  update: TelegramUpdate,
-  runtime: DaemonRuntime
-): Promise<State> => {
-  const cq = update.callback_query
-  if (!cq?.data || !cq.message) return state
+interface CallbackContext {
+  readonly config: Config
+  readonly state: State
+  readonly runtime: DaemonRuntime
+  readonly callbackId: string
+  readonly messageId: number
+  readonly threadId: number | undefined
+  /** Part of callback_data after "action:" */
+  readonly actionId: string
+}
 
-  const token = config.telegramBotToken
-  const chatId = String(config.telegramGroupId)
+type CallbackHandler = (ctx: CallbackContext) => Promise<State>
 
-  // Parse callback data: "action:id"
-  const colonIdx = cq.data.indexOf(':')
-  if (colonIdx === -1) {
-    await answerCallbackQuery(token, cq.id, 'Unknown action')()
+/**
+ * Dismiss a button spinner. Keyed by the callback id, so it never waits
+ * behind sends for the topic, and the caller never waits on the round-trip.
+ */
+const answerCallback = (config: Config, runtime: DaemonRuntime, callbackId: string, text: string): void => {
+  runtime.sendQueue.enqueue(
+    `cq:${callbackId}`, answerCallbackQuery(config.telegramBotToken, callbackId, text)
+  )
+}
+
+/**
+ * Dismiss the button spinner and replace the prompt with the outcome.
+ * The answer runs alongside the edit instead of after it (the two calls
+ * are independent); the edit stays queued behind earlier sends for the
+ * topic. The handler never waits on either round-trip.
+ */
+const acknowledgeCallback = (ctx: CallbackContext, answerText: string, editText: string): void => {
+  answerCallback(ctx.config, ctx.runtime, ctx.callbackId, answerText)
+  ctx.runtime.sendQueue.enqueue(
+    ctx.threadId ?? ctx.messageId,
+    editMessageText(ctx.config.telegramBotToken, String(ctx.config.telegramGroupId), ctx.messageId, editText)
+  )
+}
+
+/**
+ * Batch approve/deny — resolve every request in a flushed batch
+ */
+const resolveBatch = (approved: boolean): CallbackHandler => async (ctx) => {
+  const { config, state, runtime, callbackId, actionId } = ctx
+
+  const batchInfo = runtime.pendingBatches.get(actionId)
+  if (!batchInfo) {
+    answerCallback(config, runtime, callbackId, 'Batch expired')
     return state
   }
-  const action = cq.data.substring(0, colonIdx)
-  const actionId = cq.data.substring(colonIdx + 1)
-
-  // --- Batch approve/deny ---
-  if (action === 'batch_approve' || action === 'batch_deny') {
-    const batchInfo = runtime.pendingBatches.get(actionId)
-    if (!batchInfo) {
-      await answerCallbackQuery(token, cq.id, 'Batch expired')()
-      return state
-    }
-    runtime.pendingBatches.delete(actionId)
+  runtime.pendingBatches.delete(actionId)
 
-    const approved = action === 'batch_approve'
-    const sessionIpcDir = getSessionIpcDir(config, state, batchInfo.slotNum)
+  const sessionIpcDir = getSessionIpcDir(config, state, batchInfo.slotNum)
 
+  const writeResult = await writeResponses(sessionIpcDir, batchInfo.requestIds, { approved })()
+  if (E.isLeft(writeResult)) {
+    // One bad row rolls back the whole transaction — retry per request so the rest still land
+    console.error(`[callback] Batch response write failed, retrying per request: ${String(writeResult.left)}`)
     for (const reqId of batchInfo.requestIds) {
       await writeResponse(sessionIpcDir, reqId, { approved })()
     }
-
-    if (approved) {
-      startTyping(runtime, batchInfo.slotNum)
-      await trackApproval(config, state, runtime, batchInfo.sessionId, batchInfo.slotNum)
-    }
-
-    const statusText = approved
-      ? `✅ Approved all (${batchInfo.requestIds.length})`
-      : `❌ Denied all (${batchInfo.requestIds.length})`
-    await answerCallbackQuery(token, cq.id, statusText)()
-    await editMessageText(token, chatId, cq.message.message_id, statusText)()
-    return state
   }
 
-  // --- Trust session ---
-  if (action === 'trust') {
-    runtime.trustedSessions.add(actionId)
-    console.log(`[trust] Session ${actionId.slice(0,8)} is now trusted`)
-    await answerCallbackQuery(token, cq.id, '🔓 Session trusted')()
-    await editMessageText(token, chatId, cq.message.message_id, '🔓 Session trusted — auto-approving future requests')()
-    return state
+  if (approved) {
+    startTyping(runtime, batchInfo.slotNum)
+    await trackApproval(config, state, runtime, batchInfo.sessionId, batchInfo.slotNum)
   }
 
-  // --- Decline trust ---
-  if (action === 'no_trust') {
-    await answerCallbackQuery(token, cq.id, '👀 Will keep asking')()
-    await editMessageText(token, chatId, cq.message.message_id, '👀 Continuing manual review')()
-    return state
-  }
+  const statusText = approved
+    ? `✅ Approved all (${batchInfo.requestIds.length})`
+    : `❌ Denied all (${batchInfo.requestIds.length})`
+  acknowledgeCallback(ctx, statusText, statusText)
+  return state
+}
 
-  // --- Single approve/deny ---
-  if (action !== 'approve' && action !== 'deny') {
-    await answerCallbackQuery(token, cq.id, 'Unknown action')()
-    return state
-  }
+/**
+ * Trust session — auto-approve its future permission requests
+ */
+const trustSession: CallbackHandler = async (ctx) => {
+  getSessionTrust(ctx.runtime, ctx.actionId).trusted = true
+  console.log(`[trust] Session ${ctx.actionId.slice(0,8)} is now trusted`)
+  acknowledgeCallback(ctx, '🔓 Session trusted', '🔓 Session trusted — auto-approving future requests')
+  return ctx.state
+}
 
-  const approved = action === 'approve'
-  const requestId = actionId
+/**
+ * Decline trust — keep asking for each request
+ */
+const declineTrust: CallbackHandler = async (ctx) => {
+  acknowledgeCallback(ctx, '👀 Will keep asking', '👀 Continuing manual review')
+  return ctx.state
+}
+
+/**
+ * Single approve/deny — write the response for one permission request
+ */
+const resolvePermission = (approved: boolean): CallbackHandler => async (ctx) => {
+  const { config, state, runtime, threadId } = ctx
+  const requestId = ctx.actionId
 
   // Find the slot by thread ID to get session IPC dir
-  const threadId = cq.message.message_thread_id
   let slotNum: number | undefined
   if (threadId) {
     slotNum = findSlotByThreadId(state, threadId)
@@ -808,69 +932,227 @@ const handleCallbackQuery = async (
     console.warn(`[callback] Could not find slot for threadId=${threadId}, requestId=${requestId.slice(0,8)} — response NOT written`)
   }
 
-  // Answer callback query (dismiss spinner)
-  await answerCallbackQuery(
-    token, cq.id,
-    approved ? '✅ Approved' : '❌ Denied'
-  )()
-
-  // Edit original message to show decision
+  // Dismiss spinner and edit original message to show decision
   const statusText = approved ? '✅ Approved' : '❌ Denied'
-  await editMessageText(
-    token, chatId,
-    cq.message.message_id,
-    `${statusText}`
-  )()
+  acknowledgeCallback(ctx, statusText, statusText)
 
   return state
 }
 
 /**
- * Poll Telegram and route updates to appropriate handlers
+ * Callback action → handler. A Map (not an object literal) so callback_data
+ * like "constructor:x" can never resolve to an inherited property.
+ */
+const callbackHandlers: ReadonlyMap<string, CallbackHandler> = new Map([
+  ['approve', resolvePermission(true)],
+  ['deny', resolvePermission(false)],
+  ['batch_approve', resolveBatch(true)],
+  ['batch_deny', resolveBatch(false)],
+  ['trust', trustSession],
+  ['no_trust', declineTrust]
+])
+
+/**
+ * Handle a callback query (permission approve/deny button press)
  */
-const pollAndRouteUpdates = async (
+const handleCallbackQuery = async (
   config: Config,
   state: State,
+  update: TelegramUpdate,
   runtime: DaemonRuntime
 ): Promise<State> => {
-  // Non-blocking poll (timeout=0)
-  const pollResult = await pollTelegram(config, runtime.telegramOffset, 0)()
+  const cq = update.callback_query
+  if (!cq?.data || !cq.message) return state
 
-  if (E.isLeft(pollResult)) {
-    // Poll errors are transient — just skip this iteration
+  // Parse callback data: "action:id"
+  const colonIdx = cq.data.indexOf(':')
+  const handler = colonIdx === -1 ? undefined : callbackHandlers.get(cq.data.substring(0, colonIdx))
+  if (!handler) {
+    answerCallback(config, runtime, cq.id, 'Unknown action')
     return state
   }
 
-  const { updates, nextOffset } = pollResult.right
-  runtime.telegramOffset = nextOffset
+  return handler({
+    config,
+    state,
+    runtime,
+    callbackId: cq.id,
+    messageId: cq.message.message_id,
+    threadId: cq.message.message_thread_id,
+    actionId: cq.data.substring(colonIdx + 1)
+  })
+}
+
+/** Default getUpdates long-poll timeout (seconds) for the dedicated poll loop */
+const DEFAULT_POLL_TIMEOUT_SECONDS = 30
+/** Bounds for a configured timeout — 0 would turn the long-poll into a short poll */
+const MIN_POLL_TIMEOUT_SECONDS = 1
+/** Telegram's practical maximum; keeps the (timeout + 5s) abort budget sane */
+const MAX_POLL_TIMEOUT_SECONDS = 50
+
+/**
+ * Resolve config.pollTimeoutSeconds to a whole number of seconds within
+ * [MIN_POLL_TIMEOUT_SECONDS, MAX_POLL_TIMEOUT_SECONDS], falling back to the
+ * default when it is unset or not a finite number.
+ */
+const resolvePollTimeout = (config: Config): number => {
+  const seconds = config.pollTimeoutSeconds ?? DEFAULT_POLL_TIMEOUT_SECONDS
+  if (!Number.isFinite(seconds)) return DEFAULT_POLL_TIMEOUT_SECONDS
+  return Math.min(MAX_POLL_TIMEOUT_SECONDS, Math.max(MIN_POLL_TIMEOUT_SECONDS, Math.round(seconds)))
+}
+
+/** Minimum spacing between getUpdates calls that fail or return nothing */
+const POLL_RETRY_DELAY_MS = 1000
+
+/**
+ * Resolve once routeQueuedUpdates has handled everything queued so far,
+ * or as soon as signal is aborted.
+ */
+const waitForRouting = (runtime: DaemonRuntime, signal: AbortSignal): Promise<void> =>
+  new Promise(resolve => {
+    if (signal.aborted) {
+      resolve()
+      return
+    }
+    const done = (): void => {
+      signal.removeEventListener('abort', done)
+      resolve()
+    }
+    runtime.updatesRouted = done
+    signal.addEventListener('abort', done, { once: true })
+  })
+
+/**
+ * Long-poll Telegram on its own loop, independent of the IPC loop.
+ * Updates are appended to runtime.updateQueue and onUpdates wakes the main
+ * loop to route them, so IPC events never wait behind an open getUpdates.
+ * The next getUpdates acknowledges the batch (via its offset), so it is only
+ * sent once the main loop has routed it — a crash mid-batch gets the
+ * updates redelivered instead of losing them. Bursts are drained with
+ * back-to-back timeout=0 polls over the pooled connection. Runs until
+ * signal is aborted.
+ */
+const runPollLoop = async (
+  config: Config,
+  runtime: DaemonRuntime,
+  onUpdates: () => void,
+  signal: AbortSignal
+): Promise<void> => {
+  const pollTimeout = resolvePollTimeout(config)
+
+  // After a non-empty batch, drain anything else already queued on
+  // Telegram's side with timeout=0 before going back to a long-poll
+  let draining = false
+
+  while (!signal.aborted) {
+    const startedAt = Date.now()
+    const pollResult = await pollTelegram(
+      config, runtime.telegramOffset, draining ? 0 : pollTimeout, signal
+    )()
+
+    if (E.isRight(pollResult)) {
+      runtime.telegramOffset = pollResult.right.nextOffset
+      if (pollResult.right.updates.length > 0) {
+        runtime.updateQueue.push(...pollResult.right.updates)
+        const routed = waitForRouting(runtime, signal)
+        onUpdates()
+        await routed
+        draining = true
+        continue
+      }
+      if (draining) {
+        // Burst fully drained — resume long-polling straight away
+        draining = false
+        continue
+      }
+    }
+    draining = false
+
+    // Poll errors are transient; an empty poll that returned early must not
+    // spin either — space attempts by POLL_RETRY_DELAY_MS
+    const waitMs = E.isLeft(pollResult)
+      ? POLL_RETRY_DELAY_MS
+      : POLL_RETRY_DELAY_MS - (Date.now() - startedAt)
+    if (waitMs > 0) {
+      await delay(waitMs, undefined, { signal }).catch(() => {})
+    }
+  }
+}
+
+/** Update keys remembered for re-delivery de-duplication before the oldest are evicted */
+const RECENT_UPDATE_KEYS_LIMIT = 512
+
+/**
+ * Record an update as routed. Returns false if its update_id or its
+ * callback_query.id was already seen (e.g. a poll whose offset
+ * acknowledgement was lost), so approve/deny side effects never run twice.
+ * update_id is not a safe high-water mark — Telegram restarts the sequence
+ * at a random value after a week without updates — so only exact matches
+ * count. Sets iterate in insertion order, which makes the first key the
+ * oldest one to evict.
+ */
+const rememberUpdate = (runtime: DaemonRuntime, update: TelegramUpdate): boolean => {
+  const keys = [`u:${update.update_id}`]
+  if (update.callback_query) keys.push(`cq:${update.callback_query.id}`)
+  if (keys.some(key => runtime.recentUpdateKeys.has(key))) return false
+
+  for (const key of keys) {
+    runtime.recentUpdateKeys.add(key)
+    if (runtime.recentUpdateKeys.size > RECENT_UPDATE_KEYS_LIMIT) {
+      const oldest = runtime.recentUpdateKeys.values().next()
+      if (!oldest.done) runtime.recentUpdateKeys.delete(oldest.value)
+    }
+  }
+  return true
+}
+
+/**
+ * Route Telegram updates queued by the poll loop to appropriate handlers
+ */
+const routeQueuedUpdates = async (
+  config: Config,
+  state: State,
+  runtime: DaemonRuntime
+): Promise<State> => {
+  const updates = runtime.updateQueue.splice(0)
+  const updatesRouted = runtime.updatesRouted
+  runtime.updatesRouted = null
 
   let currentState = state
 
   if (updates.length > 0) {
-    console.log(`[poll] Got ${updates.length} Telegram updates, state.pendingStops=${JSON.stringify(Object.keys(currentState.pendingStops))}`)
+    console.log(`[poll] Got ${updates.length} Telegram updates`)
   }
 
-  for (const update of updates) {
-    // Handle callback queries (button presses)
-    if (update.callback_query) {
-      currentState = await handleCallbackQuery(config, currentState, update, runtime)
-      continue
-    }
+  try {
+    for (const update of updates) {
+      // Skip re-deliveries
+      if (!rememberUpdate(runtime, update)) continue
+
+      // Handle callback queries (button presses)
+      if (update.callback_query) {
+        currentState = await handleCallbackQuery(config, currentState, update, runtime)
+        continue
+      }
 
-    // Handle text messages
-    const msg = update.message
-    if (!msg?.text || msg.chat.id !== config.telegramGroupId) continue
+      // Handle text messages
+      const msg = update.message
+      if (!msg?.text || msg.chat.id !== config.telegramGroupId) continue
 
-    const threadId = msg.message_thread_id
-    if (!threadId) continue
+      const threadId = msg.message_thread_id
+      if (!threadId) continue
 
-    // Find slot by thread ID
-    const slotNum = findSlotByThreadId(currentState, threadId)
-    if (slotNum === undefined) continue
+      // Find slot by thread ID
+      const slotNum = findSlotByThreadId(currentState, threadId)
+      if (slotNum === undefined) continue
 
-    currentState = await processIncomingMessage(
-      config, currentState, slotNum, msg.text, runtime
-    )
+      currentState = await processIncomingMessage(
+        config, currentState, slotNum, msg.text, runtime
+      )
+    }
+  } finally {
+    // Release the poll loop even if a handler threw, so it can acknowledge the batch
+    updatesRouted?.()
   }
 
   return currentState
@@ -888,13 +1170,16 @@ const pollAndRouteUpdates = async (
  * Exported for testing.
  */
 export const cleanupOrphanedSlots = async (_config: Config, state: State): Promise<State> => {
+  // Nothing can be orphaned without an occupied slot — skip the query
+  if (!Object.values(state.slots).some(Boolean)) return state
+
   const dbResult = getDatabase()
   if (E.isLeft(dbResult)) return state
 
-  const sessionsResult = listActiveSessions(dbResult.right)
+  const sessionsResult = listSessionIds(dbResult.right)
   if (E.isLeft(sessionsResult)) return state
 
-  const activeSessionIds = new Set(sessionsResult.right.map(s => s.id))
+  const activeSessionIds = new Set(sessionsResult.right)
   let currentState = state
 
   for (const [key, slot] of Object.entries(currentState.slots)) {
@@ -932,14 +1217,8 @@ const runDaemonIteration = (
       // 1b. Flush expired permission batches
       await flushPermissionBatches(config, currentState, runtime)
 
-      // Debug: log pending stops count
-      const pendingCount = Object.keys(currentState.pendingStops).length
-      if (pendingCount > 0) {
-        console.log(`[iter] pendingStops: ${pendingCount}, slots: ${Object.keys(currentState.slots).filter(k => currentState.slots[parseInt(k,10)]).length}`)
-      }
-
-      // 2. Poll Telegram and route updates
-      currentState = await pollAndRouteUpdates(config, currentState, runtime)
+      // 2. Route Telegram updates queued by the poll loop
+      currentState = await routeQueuedUpdates(config, currentState, runtime)
 
       // 3. Send typing indicators for active processing slots
       await updateTypingIndicators(config, currentState, runtime)
@@ -985,6 +1264,20 @@ const runDaemonIteration = (
 // Daemon start/stop
 // ============================================================================
 
+/**
+ * Maximum time between loop iterations when no IPC write wakes the daemon.
+ * Bounds the latency of timer-driven work: permission batch flushes, typing
+ * indicators and the heartbeat file.
+ */
+const LOOP_FALLBACK_INTERVAL_MS = 1000
+
+/**
+ * Minimum spacing between daemon.heartbeat writes. The loop now wakes on
+ * every IPC write, so writing per iteration would churn the file many times
+ * a second; hooks only treat a heartbeat older than 30s as stale.
+ */
+const HEARTBEAT_WRITE_INTERVAL_MS = 5000
+
 /**
  * Start the daemon and return a stop function
  */
@@ -1030,64 +1323,97 @@ export const startDaemon = (configPath: string): TE.TaskEither<DaemonError, Stop
 
       const runtime: DaemonRuntime = {
         telegramOffset: 0,
+        recentUpdateKeys: new Set(),
+        eventsChangeStamp: null,
+        updateQueue: [],
+        updatesRouted: null,
         processedStopEvents: new Set(),
         typingSlots: new Map(),
-        typingLastSent: new Map(),
         permissionBatches: new Map(),
         pendingBatches: new Map(),
-        approvalCounts: new Map(),
-        trustedSessions: new Set(),
-        queuedInstructions: new Map()
+        batchSeq: Date.now(),
+        sessionTrust: new Map(),
+        queuedInstructions: new Map(),
+        sendQueue: createSendQueue()
       }
 
       // Write initial heartbeat immediately so hooks can verify startup
-      const heartbeatPath = path.join(configDir, 'daemon.heartbeat')
-      await fs.writeFile(heartbeatPath, String(Date.now()), 'utf-8')
+      await writeDaemonHeartbeat(configDir)
+      let lastHeartbeatAt = Date.now()
+
+      // Wake the loop as soon as a hook writes to bridge.db instead of
+      // waiting for the next tick
+      const ipcWatcher = createIpcWatcher(configDir)
 
       // Main loop — sequential async iterations (no overlapping)
-      let iterating = false
-      const loopInterval = setInterval(async () => {
-        if (!running) {
-          clearInterval(loopInterval)
-          return
-        }
+      const runLoop = async (): Promise<void> => {
+        while (running) {
+          try {
+            // bridge.db deleted or replaced underneath us: reopen so hook
+            // writes to the new file are seen, and force a full events scan
+            if (isDatabaseReplaced()) {
+              console.warn(`[daemon] ${dbPath} was replaced, reopening`)
+              const reopenResult = openDatabase(dbPath)
+              if (E.isLeft(reopenResult)) {
+                console.error('Failed to reopen SQLite database:', reopenResult.left)
+              }
+              runtime.eventsChangeStamp = null
+            }
+
+            const result = await runDaemonIteration(
+              config,
+              currentState,
+              runtime,
+              lastCleanupTime,
+              30 * 1000
+            )()
+
+            if (E.isRight(result)) {
+              currentState = result.right.state
+              lastCleanupTime = result.right.lastCleanupTime
+            } else {
+              console.error('Error in daemon iteration:', result.left)
+            }
 
-        // Prevent overlapping iterations
-        if (iterating) return
-        iterating = true
-
-        try {
-          const result = await runDaemonIteration(
-            config,
-            currentState,
-            runtime,
-            lastCleanupTime,
-            30 * 1000
-          )()
-
-          if (E.isRight(result)) {
-            currentState = result.right.state
-            lastCleanupTime = result.right.lastCleanupTime
-          } else {
-            console.error('Error in daemon iteration:', result.left)
+            // Write heartbeat file so hooks can verify daemon is alive
+            const now = Date.now()
+            if (now - lastHeartbeatAt >= HEARTBEAT_WRITE_INTERVAL_MS) {
+              lastHeartbeatAt = now
+              await writeDaemonHeartbeat(configDir, now).catch(() => {})
+            }
+          } catch (error) {
+            console.error('Unexpected error in daemon loop:', error)
           }
 
-          // Write heartbeat file so hooks can verify daemon is alive
-          const heartbeatPath = path.join(configDir, 'daemon.heartbeat')
-          await fs.writeFile(heartbeatPath, String(Date.now()), 'utf-8').catch(() => {})
-        } catch (error) {
-          console.error('Unexpected error in daemon loop:', error)
-        } finally {
-          iterating = false
+          if (running) {
+            await ipcWatcher.wait(LOOP_FALLBACK_INTERVAL_MS)
+          }
         }
-      }, 1000)
+      }
+      const loopDone = runLoop()
+
+      // Telegram long-poll runs alongside the main loop and wakes it on updates
+      const pollAbort = new AbortController()
+      const pollDone = runPollLoop(config, runtime, ipcWatcher.wake, pollAbort.signal)
 
       // Return stop function
       const stopFunction: StopFunction = (): TE.TaskEither<DaemonError, void> => {
         return TE.tryCatch(
           async () => {
             running = false
-            clearInterval(loopInterval)
+            pollAbort.abort()
+            ipcWatcher.close()
+
+            // Let the in-flight iteration finish before closing the database
+            await Promise.all([loopDone, pollDone])
+
+            // Route updates the poll loop queued after the last iteration, then
+            // acknowledge them so a restarted daemon does not handle them again
+            if (runtime.updateQueue.length > 0) {
+              await routeQueuedUpdates(config, currentState, runtime)
+              await pollTelegram(config, runtime.telegramOffset, 0)()
+            }
+            await runtime.sendQueue.drain()
 
             // Close SQLite database
             closeDatabase()
@@ -1133,7 +1459,12 @@ const main = async (): Promise<void> => {
 
     const stopFunction = result.right
 
+    // One shutdown path for every signal; a second signal while stopping
+    // (e.g. SIGINT after SIGTERM) must not close the database twice
+    let shuttingDown = false
     const handleShutdown = async (signal: string) => {
+      if (shuttingDown) return
+      shuttingDown = true
       console.log(`Received ${signal}, shutting down...`)
       const stopResult = await stopFunction()()
 
@@ -1145,8 +1476,9 @@ const main = async (): Promise<void> => {
       process.exit(0)
     }
 
-    process.on('SIGTERM', () => handleShutdown('SIGTERM'))
-    process.on('SIGINT', () => handleShutdown('SIGINT'))
+    for (const signal of ['SIGTERM', 'SIGINT'] as const) {
+      process.on(signal, () => handleShutdown(signal))
+    }
 
     console.log('Daemon is running. Press Ctrl+C to stop.')
 
@@ -1,4 +1,4 @@
-import { isSlotActive, addSlot, removeSlot, heartbeatSlot, cleanupStaleSlots, addPendingStop, removePendingStop, findPendingStopBySlot, updatePendingStopMessageId, findAvailableSlot, findSlotBySessionId, findSlotByTopicName, StateError } from '../index'
+import { isSlotActive, addSlot, removeSlot, heartbeatSlot, cleanupStaleSlots, addPendingStop, removePendingStop, findPendingStopBySlot, updatePendingStopMessageId, findAvailableSlot, findSlotBySessionId, findSlotByTopicName, findSlotByThreadId, StateError } from '../index'
 import { State, Slot, PendingStop, initialState } from '../../../types/state'
 import * as E from 'fp-ts/Either'
 
@@ -403,6 +403,20 @@ describe('findPendingStopBySlot', () => {
     const found = findPendingStopBySlot(initialState, 1)
     expect(found).toBeUndefined()
   })
+
+  it('reflects pending stops added or removed after a previous lookup', () => {
+    const ps1: PendingStop = { eventId: 'evt-1', slotNum: 1, lastMessage: 'a', timestamp: '2026-01-01T00:00:00.000Z' }
+    const ps2: PendingStop = { eventId: 'evt-2', slotNum: 2, lastMessage: 'b', timestamp: '2026-01-01T00:00:01.000Z' }
+    const state1 = addPendingStop(initialState, ps1)
+    expect(findPendingStopBySlot(state1, 2)).toBeUndefined()
+
+    const state2 = addPendingStop(state1, ps2)
+    expect(findPendingStopBySlot(state2, 2)).toEqual(ps2)
+
+    const state3 = removePendingStop(state2, 'evt-1')
+    expect(findPendingStopBySlot(state3, 1)).toBeUndefined()
+    expect(findPendingStopBySlot(state1, 1)).toEqual(ps1)
+  })
 })
 
 describe('updatePendingStopMessageId', () => {
@@ -576,3 +590,40 @@ describe('findSlotByTopicName', () => {
     expect(result![1].projectName).toBe('alokai')
   })
 })
+
+describe('findSlotByThreadId', () => {
+  const slotWithThread = (sessionId: string, threadId: number): Slot => ({
+    sessionId,
+    projectName: 'metro',
+    topicName: 'metro',
+    activatedAt: now,
+    lastHeartbeat: now,
+    threadId
+  })
+
+  it('finds slot number by thread ID', () => {
+    let state = initialState
+    state = E.getOrElse(() => state)(addSlot(state, 1, slotWithThread('session-A', 100)))
+    state = E.getOrElse(() => state)(addSlot(state, 3, slotWithThread('session-B', 300)))
+
+    expect(findSlotByThreadId(state, 300)).toBe(3)
+    expect(findSlotByThreadId(state, 100)).toBe(1)
+  })
+
+  it('returns undefined when no slot has the thread ID', () => {
+    expect(findSlotByThreadId(initialState, 42)).toBeUndefined()
+  })
+
+  it('reflects slots added or removed after a previous lookup', () => {
+    let state1 = initialState
+    state1 = E.getOrElse(() => state1)(addSlot(state1, 1, slotWithThread('session-A', 100)))
+    expect(findSlotByThreadId(state1, 200)).toBeUndefined()
+
+    const state2 = E.getOrElse(() => state1)(addSlot(state1, 2, slotWithThread('session-B', 200)))
+    expect(findSlotByThreadId(state2, 200)).toBe(2)
+
+    const state3 = removeSlot(state2, 1)
+    expect(findSlotByThreadId(state3, 100)).toBeUndefined()
+    expect(findSlotByThreadId(state1, 100)).toBe(1)
+  })
+})
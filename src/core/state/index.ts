@@ -122,13 +122,33 @@ export const removePendingStop = (state: State, eventId: string): State => {
   return { ...state, pendingStops: rest }
 }
 
+/**
+ * slotNum → first pending stop, memoized per pendingStops record.
+ * State is immutable, so every add/remove produces a new record and a stale
+ * index is simply never looked up again (and is garbage-collected with it).
+ */
+const pendingStopsBySlot = new WeakMap<State['pendingStops'], ReadonlyMap<number, PendingStop>>()
+
+const indexPendingStopsBySlot = (
+  pendingStops: State['pendingStops']
+): ReadonlyMap<number, PendingStop> => {
+  const cached = pendingStopsBySlot.get(pendingStops)
+  if (cached) return cached
+
+  const index = new Map<number, PendingStop>()
+  for (const ps of Object.values(pendingStops)) {
+    if (!index.has(ps.slotNum)) index.set(ps.slotNum, ps)
+  }
+  pendingStopsBySlot.set(pendingStops, index)
+  return index
+}
+
 /**
  * Find a pending stop by slot number
  * Returns the first pending stop for this slot, or undefined
  */
-export const findPendingStopBySlot = (state: State, slotNum: number): PendingStop | undefined => {
-  return Object.values(state.pendingStops).find(ps => ps.slotNum === slotNum)
-}
+export const findPendingStopBySlot = (state: State, slotNum: number): PendingStop | undefined =>
+  indexPendingStopsBySlot(state.pendingStops).get(slotNum)
 
 /**
  * Update the Telegram message ID on a pending stop
@@ -189,3 +209,30 @@ export const findSlotByTopicName = (state: State, topicName: string): [number, S
   }
   return null
 }
+
+/**
+ * threadId → slotNum, memoized per slots record (same scheme as the
+ * pending-stop index: every slot change produces a new record).
+ */
+const slotsByThreadId = new WeakMap<State['slots'], ReadonlyMap<number, number>>()
+
+const indexSlotsByThreadId = (slots: State['slots']): ReadonlyMap<number, number> => {
+  const cached = slotsByThreadId.get(slots)
+  if (cached) return cached
+
+  const index = new Map<number, number>()
+  for (const [key, slot] of Object.entries(slots)) {
+    if (slot?.threadId !== undefined && !index.has(slot.threadId)) {
+      index.set(slot.threadId, parseInt(key, 10))
+    }
+  }
+  slotsByThreadId.set(slots, index)
+  return index
+}
+
+/**
+ * Find a slot number by its Telegram forum topic (message_thread_id)
+ * Returns the slot number, or undefined
+ */
+export const findSlotByThreadId = (state: State, threadId: number): number | undefined =>
+  indexSlotsByThreadId(state.slots).get(threadId)
@@ -7,7 +7,7 @@ import * as E from 'fp-ts/Either'
 import * as fs from 'fs/promises'
 import * as path from 'path'
 import * as os from 'os'
-import { checkDaemonHealth, ensureDaemonAlive, updateDaemonPidInState, type DaemonHealthStatus } from '../daemon-health'
+import { checkDaemonHealth, ensureDaemonAlive, updateDaemonPidInState, writeDaemonHeartbeat, type DaemonHealthStatus } from '../daemon-health'
 
 // Mock isDaemonAlive and startDaemon to control behavior without real processes
 jest.mock('../daemon-launcher', () => ({
@@ -320,4 +320,35 @@ describe('updateDaemonPidInState', () => {
     const badDir = path.join(configDir, 'nonexistent')
     await expect(updateDaemonPidInState(badDir, 444)).resolves.toBeUndefined()
   })
+
+  it('leaves no temporary file behind', async () => {
+    await updateDaemonPidInState(configDir, 555)
+
+    const entries = await fs.readdir(configDir)
+    expect(entries).toEqual(['daemon.pid'])
+  })
+})
+
+describe('writeDaemonHeartbeat', () => {
+  let configDir: string
+
+  beforeEach(async () => {
+    configDir = await fs.mkdtemp(path.join(os.tmpdir(), 'heartbeat-test-'))
+  })
+
+  afterEach(async () => {
+    await fs.rm(configDir, { recursive: true, force: true }).catch(() => {})
+  })
+
+  it('writes the timestamp readable by checkDaemonHealth', async () => {
+    await writeDaemonHeartbeat(configDir, 1_700_000_000_000)
+
+    const content = await fs.readFile(path.join(configDir, 'daemon.heartbeat'), 'utf-8')
+    expect(parseInt(content.trim(), 10)).toBe(1_700_000_000_000)
+    expect(await fs.readdir(configDir)).toEqual(['daemon.heartbeat'])
+  })
+
+  it('rejects when the directory does not exist', async () => {
+    await expect(writeDaemonHeartbeat(path.join(configDir, 'nonexistent'))).rejects.toBeDefined()
+  })
 })
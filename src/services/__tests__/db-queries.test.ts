@@ -11,11 +11,14 @@ import {
   updateSessionThreadId,
   deleteSession,
   listActiveSessions,
+  listSessionIds,
   insertEvent,
   findUnprocessedEvents,
   markEventProcessed,
   deleteSessionEvents,
+  readChangeStamp,
   insertResponse,
+  insertResponses,
   findUnreadResponse,
   markResponseRead,
   insertBatch,
@@ -229,6 +232,15 @@ describe('db-queries', () => {
       expect(result.right[0]?.slot_num).toBe(1)
       expect(result.right[1]?.slot_num).toBe(2)
     })
+
+    it('listSessionIds returns only session IDs', () => {
+      insertSession(db, 's2', 2, null, '2024-01-01T00:00:00Z')
+      insertSession(db, 's1', 1, null, '2024-01-01T00:00:00Z')
+      const result = listSessionIds(db)
+      expect(E.isRight(result)).toBe(true)
+      if (!E.isRight(result)) return
+      expect([...result.right].sort()).toEqual(['s1', 's2'])
+    })
   })
 
   // ========================================================================
@@ -269,6 +281,37 @@ describe('db-queries', () => {
       if (!E.isRight(result)) return
       expect(result.right).toHaveLength(0)
     })
+
+    it('readChangeStamp is stable until a write happens', () => {
+      const before = readChangeStamp(db)
+      const again = readChangeStamp(db)
+      expect(E.isRight(before)).toBe(true)
+      if (!E.isRight(before) || !E.isRight(again)) return
+      expect(again.right).toBe(before.right)
+
+      seedEvent(db)
+      const after = readChangeStamp(db)
+      if (!E.isRight(after)) return
+      expect(after.right).not.toBe(before.right)
+    })
+
+    it('repeated queries see fresh rows on each connection', () => {
+      seedEvent(db, 'e1')
+      const first = findUnprocessedEvents(db, 's1')
+      seedEvent(db, 'e2')
+      const second = findUnprocessedEvents(db, 's1')
+      if (!E.isRight(first) || !E.isRight(second)) return
+      expect(first.right).toHaveLength(1)
+      expect(second.right).toHaveLength(2)
+
+      // A second connection must not reuse statements bound to the first
+      const other = createTestDb()
+      insertSession(other, 's1', 1, 'test-project', '2024-01-01T00:00:00Z')
+      const onOther = findUnprocessedEvents(other, 's1')
+      other.close()
+      if (!E.isRight(onOther)) return
+      expect(onOther.right).toHaveLength(0)
+    })
   })
 
   // ========================================================================
@@ -302,6 +345,33 @@ describe('db-queries', () => {
       if (!E.isRight(result)) return
       expect(result.right).toBeUndefined()
     })
+
+    it('insertResponses writes every row', () => {
+      seedEvent(db, 'e2')
+      const result = insertResponses(db, [
+        { id: 'r1', eventId: 'e1', payload: '{"approved":true}' },
+        { id: 'r2', eventId: 'e2', payload: '{"approved":true}' }
+      ])
+      expect(E.isRight(result)).toBe(true)
+
+      const r1 = findUnreadResponse(db, 'e1')
+      const r2 = findUnreadResponse(db, 'e2')
+      if (!E.isRight(r1) || !E.isRight(r2)) return
+      expect(r1.right?.payload).toBe('{"approved":true}')
+      expect(r2.right?.payload).toBe('{"approved":true}')
+    })
+
+    it('insertResponses rolls back all rows when one fails', () => {
+      const result = insertResponses(db, [
+        { id: 'r1', eventId: 'e1', payload: '{"approved":true}' },
+        { id: 'r2', eventId: 'missing-event', payload: '{"approved":true}' }
+      ])
+      expect(E.isLeft(result)).toBe(true)
+
+      const r1 = findUnreadResponse(db, 'e1')
+      if (!E.isRight(r1)) return
+      expect(r1.right).toBeUndefined()
+    })
   })
 
   // ========================================================================
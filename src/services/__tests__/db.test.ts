@@ -3,7 +3,7 @@ import * as path from 'path'
 import * as fs from 'fs'
 import * as os from 'os'
 import { DatabaseSync } from 'node:sqlite'
-import { openDatabase, closeDatabase, getDatabase, openMemoryDatabase } from '../db'
+import { openDatabase, closeDatabase, getDatabase, openMemoryDatabase, isDatabaseReplaced } from '../db'
 
 describe('db', () => {
   let tmpDir: string
@@ -168,6 +168,53 @@ describe('db', () => {
     })
   })
 
+  describe('isDatabaseReplaced', () => {
+    it('is false while the opened file is in place', () => {
+      openDatabase(path.join(tmpDir, 'bridge.db'))
+      expect(isDatabaseReplaced()).toBe(false)
+    })
+
+    it('is true once the file is deleted', () => {
+      const dbPath = path.join(tmpDir, 'bridge.db')
+      openDatabase(dbPath)
+      fs.unlinkSync(dbPath)
+      expect(isDatabaseReplaced()).toBe(true)
+    })
+
+    it('is true when a new file takes the same path', () => {
+      const dbPath = path.join(tmpDir, 'bridge.db')
+      openDatabase(dbPath)
+      fs.renameSync(dbPath, path.join(tmpDir, 'old.db'))
+      fs.writeFileSync(dbPath, '')
+      expect(isDatabaseReplaced()).toBe(true)
+    })
+
+    it('stays true and keeps the old connection when a reopen fails', () => {
+      const dbPath = path.join(tmpDir, 'bridge.db')
+      const first = openDatabase(dbPath)
+      if (!E.isRight(first)) throw new Error('open failed')
+
+      // Something that cannot be opened as a database takes the path
+      fs.unlinkSync(dbPath)
+      fs.mkdirSync(dbPath)
+
+      expect(E.isLeft(openDatabase(dbPath))).toBe(true)
+      expect(isDatabaseReplaced()).toBe(true)
+      const current = getDatabase()
+      expect(E.isRight(current) && current.right).toBe(first.right)
+
+      // Retry succeeds once the path is usable again
+      fs.rmdirSync(dbPath)
+      expect(E.isRight(openDatabase(dbPath))).toBe(true)
+      expect(isDatabaseReplaced()).toBe(false)
+    })
+
+    it('is false for an in-memory database', () => {
+      openMemoryDatabase()
+      expect(isDatabaseReplaced()).toBe(false)
+    })
+  })
+
   describe('openMemoryDatabase', () => {
     it('creates in-memory database with schema', () => {
       const result = openMemoryDatabase()
@@ -1,13 +1,15 @@
 import * as E from 'fp-ts/Either'
-import { openMemoryDatabase, closeDatabase } from '../db'
-import { insertSession } from '../db-queries'
+import { openMemoryDatabase, closeDatabase, getDatabase } from '../db'
+import { insertSession, insertEvent } from '../db-queries'
 import {
   writeEvent,
   readEventQueue,
+  readAllUnprocessedEvents,
   readEventsBySession,
   deleteEventFile,
   markSessionEventsProcessed,
   writeResponse,
+  writeResponses,
   readResponse,
   listEvents,
   createIpcDir,
@@ -86,6 +88,37 @@ describe('ipc-sqlite', () => {
     })
   })
 
+  describe('readAllUnprocessedEvents', () => {
+    it('returns parsed events with their row and session IDs', async () => {
+      const event = permissionRequest('req-1', 'Bash', 'echo hi', 1, 'sess-1')
+      await writeEvent('/ipc/sess-1/events.jsonl', event)()
+
+      const result = await readAllUnprocessedEvents()()
+      expect(E.isRight(result)).toBe(true)
+      if (!E.isRight(result)) return
+      expect(result.right).toHaveLength(1)
+      expect(result.right[0]?.eventRowId).toBe('req-1')
+      expect(result.right[0]?.sessionId).toBe('sess-1')
+      expect(result.right[0]?.event._tag).toBe('PermissionRequest')
+    })
+
+    it('skips and retires a malformed payload without dropping the rest', async () => {
+      const dbResult = getDatabase()
+      if (!E.isRight(dbResult)) throw new Error('Database not open')
+      insertEvent(dbResult.right, 'bad-1', 'sess-1', 'Stop', '{not json')
+      await writeEvent('/ipc/sess-1/events.jsonl', permissionRequest('req-2', 'Bash', 'ls', 1, 'sess-1'))()
+
+      const warn = jest.spyOn(console, 'warn').mockImplementation(() => {})
+      const first = await readAllUnprocessedEvents()()
+      const second = await readAllUnprocessedEvents()()
+      warn.mockRestore()
+
+      if (!E.isRight(first) || !E.isRight(second)) throw new Error('read failed')
+      expect(first.right.map(e => e.eventRowId)).toEqual(['req-2'])
+      expect(second.right.map(e => e.eventRowId)).toEqual(['req-2'])
+    })
+  })
+
   describe('markSessionEventsProcessed', () => {
     it('marks all events as processed', async () => {
       const e1 = permissionRequest('req-1', 'Bash', 'cmd1', 1, 'sess-1')
@@ -161,6 +194,21 @@ describe('ipc-sqlite', () => {
       expect(readResult.right).toBeNull()
     })
 
+    it('writes one response per event with writeResponses', async () => {
+      await writeEvent('/ipc/sess-1/events.jsonl', permissionRequest('req-1', 'Bash', 'cmd', 1, 'sess-1'))()
+      await writeEvent('/ipc/sess-1/events.jsonl', permissionRequest('req-2', 'Edit', 'file', 1, 'sess-1'))()
+
+      const writeResult = await writeResponses('/ipc/sess-1', ['req-1', 'req-2'], { approved: true })()
+      expect(E.isRight(writeResult)).toBe(true)
+
+      for (const id of ['req-1', 'req-2']) {
+        const readResult = await readResponse('/ipc/sess-1', id)()
+        expect(E.isRight(readResult)).toBe(true)
+        if (!E.isRight(readResult)) return
+        expect((readResult.right as unknown as Record<string, unknown>)['approved']).toBe(true)
+      }
+    })
+
     it('marks response as read after first read', async () => {
       const event = permissionRequest('req-1', 'Bash', 'cmd', 1, 'sess-1')
       await writeEvent('/ipc/sess-1/events.jsonl', event)()
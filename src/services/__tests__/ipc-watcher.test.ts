@@ -0,0 +1,66 @@
+/**
+ * @module services/ipc-watcher.test
+ * Tests for the IPC database watcher that wakes the daemon loop
+ */
+
+import * as fs from 'fs/promises'
+import * as path from 'path'
+import * as os from 'os'
+import { createIpcWatcher, type IpcWatcher } from '../ipc-watcher'
+
+describe('createIpcWatcher', () => {
+  let configDir: string
+  let watcher: IpcWatcher | null
+
+  beforeEach(async () => {
+    configDir = await fs.mkdtemp(path.join(os.tmpdir(), 'ipc-watcher-test-'))
+    watcher = null
+  })
+
+  afterEach(async () => {
+    watcher?.close()
+    await fs.rm(configDir, { recursive: true, force: true }).catch(() => {})
+  })
+
+  it('resolves wait() after the timeout when nothing is written', async () => {
+    watcher = createIpcWatcher(configDir)
+    const start = Date.now()
+    await watcher.wait(100)
+    expect(Date.now() - start).toBeGreaterThanOrEqual(90)
+  })
+
+  it('wake() releases a pending wait() immediately', async () => {
+    watcher = createIpcWatcher(configDir)
+    const start = Date.now()
+    const waiting = watcher.wait(5000)
+    watcher.wake()
+    await waiting
+    expect(Date.now() - start).toBeLessThan(1000)
+  })
+
+  it('wake() before wait() makes the next wait() return at once', async () => {
+    watcher = createIpcWatcher(configDir)
+    watcher.wake()
+    const start = Date.now()
+    await watcher.wait(5000)
+    expect(Date.now() - start).toBeLessThan(1000)
+  })
+
+  it('wakes when the WAL file is written', async () => {
+    watcher = createIpcWatcher(configDir)
+    const start = Date.now()
+    const waiting = watcher.wait(5000)
+    await fs.writeFile(path.join(configDir, 'bridge.db-wal'), 'x', 'utf-8')
+    await waiting
+    expect(Date.now() - start).toBeLessThan(2000)
+  })
+
+  it('close() releases a pending wait()', async () => {
+    watcher = createIpcWatcher(configDir)
+    const start = Date.now()
+    const waiting = watcher.wait(5000)
+    watcher.close()
+    await waiting
+    expect(Date.now() - start).toBeLessThan(1000)
+  })
+})
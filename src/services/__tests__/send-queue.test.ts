@@ -0,0 +1,92 @@
+/**
+ * @module services/send-queue.test
+ * Tests for the keyed, concurrency-limited Telegram send queue
+ */
+
+import * as E from 'fp-ts/Either'
+import { createSendQueue } from '../send-queue'
+
+const deferred = (): { promise: Promise<void>; resolve: () => void } => {
+  let resolve!: () => void
+  const promise = new Promise<void>(r => { resolve = r })
+  return { promise, resolve }
+}
+
+const flush = (): Promise<void> => new Promise(resolve => setImmediate(resolve))
+
+describe('createSendQueue', () => {
+  it('resolves run() with the task result', async () => {
+    const queue = createSendQueue()
+    await expect(queue.run(1, async () => 42)).resolves.toBe(42)
+  })
+
+  it('runs tasks with the same key in order', async () => {
+    const queue = createSendQueue(2)
+    const order: string[] = []
+    const first = deferred()
+
+    queue.enqueue(100, async () => { await first.promise; order.push('a') })
+    queue.enqueue(100, async () => { order.push('b') })
+    await flush()
+    expect(order).toEqual([])
+
+    first.resolve()
+    await queue.drain()
+    expect(order).toEqual(['a', 'b'])
+  })
+
+  it('runs tasks with different keys concurrently', async () => {
+    const queue = createSendQueue(2)
+    const blocker = deferred()
+    const started: number[] = []
+
+    queue.enqueue(1, async () => { started.push(1); await blocker.promise })
+    queue.enqueue(2, async () => { started.push(2); await blocker.promise })
+    await flush()
+    expect(started).toEqual([1, 2])
+
+    blocker.resolve()
+    await queue.drain()
+  })
+
+  it('caps tasks in flight at the concurrency limit', async () => {
+    const queue = createSendQueue(1)
+    const blocker = deferred()
+    const started: number[] = []
+
+    queue.enqueue(1, async () => { started.push(1); await blocker.promise })
+    queue.enqueue(2, async () => { started.push(2) })
+    await flush()
+    expect(started).toEqual([1])
+
+    blocker.resolve()
+    await queue.drain()
+    expect(started).toEqual([1, 2])
+  })
+
+  it('keeps going after a failed task', async () => {
+    const queue = createSendQueue()
+    const errorSpy = jest.spyOn(console, 'error').mockImplementation(() => {})
+
+    queue.enqueue(1, async () => { throw new Error('boom') })
+    await expect(queue.run(1, async () => 'next')).resolves.toBe('next')
+    expect(errorSpy).toHaveBeenCalled()
+
+    errorSpy.mockRestore()
+  })
+
+  it('logs an enqueued task that resolves to a Left', async () => {
+    const queue = createSendQueue()
+    const errorSpy = jest.spyOn(console, 'error').mockImplementation(() => {})
+
+    queue.enqueue(1, async () => E.left(new Error('Bad Request')))
+    queue.enqueue(2, async () => E.right({ ok: true }))
+    await queue.drain()
+    await flush()
+
+    expect(errorSpy).toHaveBeenCalledTimes(1)
+    expect(errorSpy).toHaveBeenCalledWith('[send-queue] Send for 1 failed: Error: Bad Request')
+
+    errorSpy.mockRestore()
+  })
+})
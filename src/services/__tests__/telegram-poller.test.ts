@@ -0,0 +1,124 @@
+/**
+ * @module services/telegram-poller.test
+ * Tests for Telegram long-poll client
+ */
+
+import * as E from 'fp-ts/Either'
+import { pollTelegram } from '../telegram-poller'
+import { sendMessageToTopic } from '../telegram'
+import { Config } from '../../types/config'
+
+const config: Config = {
+  telegramBotToken: 'test-token',
+  telegramGroupId: -100123,
+  ipcBaseDir: '/tmp/ipc',
+  sessionTimeout: 60_000
+}
+
+describe('pollTelegram', () => {
+  const mockFetch = jest.fn()
+
+  beforeEach(() => {
+    mockFetch.mockClear()
+    global.fetch = mockFetch as any
+  })
+
+  afterEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('calls getUpdates through the shared Bot API client', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      status: 200,
+      json: async () => ({ ok: true, result: [] })
+    })
+
+    await pollTelegram(config, 42, 30)()
+
+    const [url, options] = mockFetch.mock.calls[0]
+    expect(url).toBe('https://api.telegram.org/bottest-token/getUpdates')
+    expect(options.method).toBe('POST')
+    const body = JSON.parse(options.body)
+    expect(body.offset).toBe(42)
+    expect(body.timeout).toBe(30)
+    expect(body.allowed_updates).toEqual(['message', 'callback_query'])
+  })
+
+  it('advances the offset past the last received update', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      status: 200,
+      json: async () => ({ ok: true, result: [{ update_id: 7 }, { update_id: 9 }] })
+    })
+
+    const result = await pollTelegram(config, 0, 0)()
+
+    expect(E.isRight(result)).toBe(true)
+    if (E.isRight(result)) {
+      expect(result.right.updates).toHaveLength(2)
+      expect(result.right.nextOffset).toBe(10)
+    }
+  })
+
+  it('keeps the current offset when no updates arrive', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      status: 200,
+      json: async () => ({ ok: true, result: [] })
+    })
+
+    const result = await pollTelegram(config, 5, 0)()
+
+    expect(E.isRight(result)).toBe(true)
+    if (E.isRight(result)) {
+      expect(result.right.nextOffset).toBe(5)
+    }
+  })
+
+  it('maps API failures to PollerError', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      status: 200,
+      json: async () => ({ ok: false, description: 'Conflict: terminated by other getUpdates request' })
+    })
+
+    const result = await pollTelegram(config, 0, 0)()
+
+    expect(E.isLeft(result)).toBe(true)
+    if (E.isLeft(result)) {
+      expect(result.left._tag).toBe('PollerError')
+      expect(result.left.message).toContain('Conflict')
+    }
+  })
+
+  // fetch is mocked, so this only covers the client side: callTelegramApi
+  // does not serialize calls. Socket-level separation is up to the dispatcher.
+  it('does not serialize a send behind a pending getUpdates call', async () => {
+    let releasePoll: () => void = () => {}
+    mockFetch.mockImplementation((url: string) => {
+      if (url.endsWith('/getUpdates')) {
+        return new Promise(resolve => {
+          releasePoll = () => resolve({
+            ok: true,
+            status: 200,
+            json: async () => ({ ok: true, result: [] })
+          })
+        })
+      }
+      return Promise.resolve({
+        ok: true,
+        status: 200,
+        json: async () => ({ ok: true, result: { message_id: 1 } })
+      })
+    })
+
+    const poll = pollTelegram(config, 0, 30)()
+    const send = await sendMessageToTopic('test-token', '-100123', 'hi', 5)()
+
+    expect(E.isRight(send)).toBe(true)
+    releasePoll()
+    const polled = await poll
+    expect(E.isRight(polled)).toBe(true)
+  })
+})
@@ -4,7 +4,7 @@
  */
 
 import * as E from 'fp-ts/Either'
-import { sendTelegramMessage, sendTelegramReplyWithButtons } from '../telegram'
+import { sendTelegramMessage, sendTelegramReplyWithButtons, callTelegramApi } from '../telegram'
 
 describe('sendTelegramMessage', () => {
   const mockFetch = jest.fn()
@@ -551,3 +551,52 @@ describe('sendTelegramReplyWithButtons', () => {
     expect(mockFetch).not.toHaveBeenCalled()
   })
 })
+
+describe('callTelegramApi', () => {
+  const mockFetch = jest.fn()
+
+  beforeEach(() => {
+    mockFetch.mockClear()
+    global.fetch = mockFetch as any
+  })
+
+  afterEach(() => {
+    jest.clearAllMocks()
+  })
+
+  it('attaches an abort signal so stalled requests release the connection', async () => {
+    mockFetch.mockResolvedValueOnce({
+      ok: true,
+      status: 200,
+      json: async () => ({ ok: true, result: true })
+    })
+
+    await callTelegramApi('token', 'sendChatAction', { chat_id: '1', action: 'typing' })()
+
+    const [, options] = mockFetch.mock.calls[0]
+    expect(options.signal).toBeInstanceOf(AbortSignal)
+  })
+
+  it('returns Left when the request is aborted', async () => {
+    mockFetch.mockRejectedValueOnce(new Error('This operation was aborted'))
+
+    const result = await callTelegramApi('token', 'getMe', {}, 10)()
+
+    expect(E.isLeft(result)).toBe(true)
+  })
+
+  it('aborts the request when the caller signal fires', async () => {
+    mockFetch.mockImplementationOnce((_url: string, options: { signal: AbortSignal }) =>
+      new Promise((_resolve, reject) => {
+        options.signal.addEventListener('abort', () => reject(new Error('aborted')))
+      })
+    )
+
+    const caller = new AbortController()
+    const pending = callTelegramApi('token', 'getUpdates', { timeout: 30 }, 35_000, caller.signal)()
+    caller.abort()
+    const result = await pending
+
+    expect(E.isLeft(result)).toBe(true)
+  })
+})
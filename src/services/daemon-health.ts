@@ -60,7 +60,7 @@ export const daemonDead = (pid: number | null, reason: string): DaemonDead => ({
 // Constants
 // ============================================================================
 
-/** Heartbeat older than this is considered stale (daemon may be hung) */
+/** Heartbeat older than this is considered stale (daemon may be hung); keep well above the daemon's 5s write interval */
 const HEARTBEAT_STALE_THRESHOLD_MS = 30_000
 
 // ============================================================================
@@ -148,18 +148,38 @@ export const checkDaemonHealth = (
 // State helpers
 // ============================================================================
 
+/**
+ * Write a file via tmp + rename so concurrent readers never see it empty or
+ * half-written (a torn read of daemon.pid/daemon.heartbeat looks "dead").
+ */
+const writeFileAtomic = async (filePath: string, content: string): Promise<void> => {
+  const tmpPath = `${filePath}.tmp`
+  await fs.writeFile(tmpPath, content, 'utf-8')
+  await fs.rename(tmpPath, filePath)
+}
+
 /**
  * Write daemon PID to daemon.pid file.
  */
 export const updateDaemonPidInState = async (configDir: string, pid: number): Promise<void> => {
   const pidPath = path.join(configDir, 'daemon.pid')
   try {
-    await fs.writeFile(pidPath, String(pid), 'utf-8')
+    await writeFileAtomic(pidPath, String(pid))
   } catch (error) {
     console.error(`[daemon-health] Failed to write daemon PID: ${String(error)}`)
   }
 }
 
+/**
+ * Write the current timestamp to daemon.heartbeat.
+ * The daemon loop throttles calls to one per HEARTBEAT_WRITE_INTERVAL_MS (5s),
+ * so the file can be up to ~5s old while the daemon is healthy —
+ * HEARTBEAT_STALE_THRESHOLD_MS (used by ensureDaemonAlive) must stay well
+ * above that. Rejects on write failure.
+ */
+export const writeDaemonHeartbeat = (configDir: string, now: number = Date.now()): Promise<void> =>
+  writeFileAtomic(path.join(configDir, 'daemon.heartbeat'), String(now))
+
 // ============================================================================
 // Ensure daemon alive (check + restart if needed)
 // ============================================================================
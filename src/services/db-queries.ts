@@ -1,4 +1,4 @@
-import { DatabaseSync } from 'node:sqlite'
+import { DatabaseSync, StatementSync } from 'node:sqlite'
 import * as E from 'fp-ts/Either'
 import { DbError, queryError, constraintError } from '../types/db'
 
@@ -6,6 +6,29 @@ import { DbError, queryError, constraintError } from '../types/db'
 // Helpers
 // ============================================================================
 
+/**
+ * Prepared statements cached per connection, keyed by SQL text.
+ * Compiling the SQL is the costly part of these small queries and the daemon
+ * reruns the same few every tick. The cache is keyed on the handle, so a
+ * reopened database starts fresh and a closed one's statements are
+ * garbage-collected with it.
+ */
+const statementCache = new WeakMap<DatabaseSync, Map<string, StatementSync>>()
+
+const prepare = (db: DatabaseSync, sql: string): StatementSync => {
+  let statements = statementCache.get(db)
+  if (!statements) {
+    statements = new Map()
+    statementCache.set(db, statements)
+  }
+  let stmt = statements.get(sql)
+  if (!stmt) {
+    stmt = db.prepare(sql)
+    statements.set(sql, stmt)
+  }
+  return stmt
+}
+
 const tryCatch = <T>(fn: () => T, label: string): E.Either<DbError, T> => {
   try {
     return E.right(fn())
@@ -48,15 +71,16 @@ export const ensureSessionForIpc = (
   slotNum: number
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    const existing = db.prepare('SELECT id FROM sessions WHERE id = ?').get(sessionId) as
+    const existing = prepare(db, 'SELECT id FROM sessions WHERE id = ?').get(sessionId) as
       | { id: string }
       | undefined
     if (existing) return
 
     // Remove any stale session occupying this slot (CASCADE cleans events/responses)
-    db.prepare('DELETE FROM sessions WHERE slot_num = ?').run(slotNum)
+    prepare(db, 'DELETE FROM sessions WHERE slot_num = ?').run(slotNum)
 
-    db.prepare(
+    prepare(
+      db,
       "INSERT INTO sessions (id, slot_num, activated_at) VALUES (?, ?, datetime('now'))"
     ).run(sessionId, slotNum)
   }, 'ensureSessionForIpc')
@@ -69,7 +93,8 @@ export const insertSession = (
   activatedAt: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       'INSERT INTO sessions (id, slot_num, project_name, activated_at) VALUES (?, ?, ?, ?)'
     ).run(id, slotNum, projectName, activatedAt)
   }, 'insertSession')
@@ -79,7 +104,7 @@ export const findSessionBySlot = (
   slotNum: number
 ): E.Either<DbError, SessionRow | undefined> =>
   tryCatch(
-    () => db.prepare('SELECT * FROM sessions WHERE slot_num = ?').get(slotNum) as SessionRow | undefined,
+    () => prepare(db, 'SELECT * FROM sessions WHERE slot_num = ?').get(slotNum) as SessionRow | undefined,
     'findSessionBySlot'
   )
 
@@ -89,7 +114,7 @@ export const findSessionByClaudeId = (
 ): E.Either<DbError, SessionRow | undefined> =>
   tryCatch(
     () =>
-      db.prepare('SELECT * FROM sessions WHERE claude_session_id = ?').get(claudeSessionId) as
+      prepare(db, 'SELECT * FROM sessions WHERE claude_session_id = ?').get(claudeSessionId) as
         | SessionRow
         | undefined,
     'findSessionByClaudeId'
@@ -101,7 +126,7 @@ export const updateSessionBinding = (
   claudeSessionId: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('UPDATE sessions SET claude_session_id = ? WHERE id = ?').run(
+    prepare(db, 'UPDATE sessions SET claude_session_id = ? WHERE id = ?').run(
       claudeSessionId,
       sessionId
     )
@@ -113,7 +138,7 @@ export const updateSessionHeartbeat = (
   heartbeat: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('UPDATE sessions SET last_heartbeat = ? WHERE id = ?').run(heartbeat, sessionId)
+    prepare(db, 'UPDATE sessions SET last_heartbeat = ? WHERE id = ?').run(heartbeat, sessionId)
   }, 'updateSessionHeartbeat')
 
 export const updateSessionTrust = (
@@ -122,7 +147,7 @@ export const updateSessionTrust = (
   trusted: boolean
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('UPDATE sessions SET trusted = ? WHERE id = ?').run(trusted ? 1 : 0, sessionId)
+    prepare(db, 'UPDATE sessions SET trusted = ? WHERE id = ?').run(trusted ? 1 : 0, sessionId)
   }, 'updateSessionTrust')
 
 export const incrementApprovalCount = (
@@ -130,8 +155,7 @@ export const incrementApprovalCount = (
   sessionId: string
 ): E.Either<DbError, number> =>
   tryCatch(() => {
-    const row = db
-      .prepare('UPDATE sessions SET approval_count = approval_count + 1 WHERE id = ? RETURNING approval_count')
+    const row = prepare(db, 'UPDATE sessions SET approval_count = approval_count + 1 WHERE id = ? RETURNING approval_count')
       .get(sessionId) as { approval_count: number } | undefined
     return row?.approval_count ?? 0
   }, 'incrementApprovalCount')
@@ -142,7 +166,7 @@ export const updateSessionThreadId = (
   threadId: number
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('UPDATE sessions SET thread_id = ? WHERE id = ?').run(threadId, sessionId)
+    prepare(db, 'UPDATE sessions SET thread_id = ? WHERE id = ?').run(threadId, sessionId)
   }, 'updateSessionThreadId')
 
 export const deleteSession = (
@@ -150,17 +174,29 @@ export const deleteSession = (
   sessionId: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('DELETE FROM sessions WHERE id = ?').run(sessionId)
+    prepare(db, 'DELETE FROM sessions WHERE id = ?').run(sessionId)
   }, 'deleteSession')
 
 export const listActiveSessions = (
   db: DatabaseSync
 ): E.Either<DbError, readonly SessionRow[]> =>
   tryCatch(
-    () => db.prepare('SELECT * FROM sessions ORDER BY slot_num').all() as unknown as SessionRow[],
+    () => prepare(db, 'SELECT * FROM sessions ORDER BY slot_num').all() as unknown as SessionRow[],
     'listActiveSessions'
   )
 
+/**
+ * IDs of all sessions — for membership checks that need nothing else
+ */
+export const listSessionIds = (
+  db: DatabaseSync
+): E.Either<DbError, readonly string[]> =>
+  tryCatch(
+    () =>
+      (prepare(db, 'SELECT id FROM sessions').all() as unknown as Array<{ id: string }>).map(r => r.id),
+    'listSessionIds'
+  )
+
 // ============================================================================
 // Events
 // ============================================================================
@@ -183,7 +219,8 @@ export const insertEvent = (
   payload: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       'INSERT INTO events (id, session_id, event_type, payload) VALUES (?, ?, ?, ?)'
     ).run(id, sessionId, eventType, payload)
   }, 'insertEvent')
@@ -194,20 +231,21 @@ export const findUnprocessedEvents = (
 ): E.Either<DbError, readonly EventRow[]> =>
   tryCatch(
     () =>
-      db
-        .prepare('SELECT * FROM events WHERE session_id = ? AND processed = 0 ORDER BY created_at')
+      prepare(db, 'SELECT * FROM events WHERE session_id = ? AND processed = 0 ORDER BY created_at')
         .all(sessionId) as unknown as EventRow[],
     'findUnprocessedEvents'
   )
 
+/** Columns the daemon needs to dispatch an unprocessed event */
+export type UnprocessedEventRow = Pick<EventRow, 'id' | 'session_id' | 'payload'>
+
 export const findAllUnprocessedEvents = (
   db: DatabaseSync
-): E.Either<DbError, readonly EventRow[]> =>
+): E.Either<DbError, readonly UnprocessedEventRow[]> =>
   tryCatch(
     () =>
-      db
-        .prepare('SELECT * FROM events WHERE processed = 0 ORDER BY created_at')
-        .all() as unknown as EventRow[],
+      prepare(db, 'SELECT id, session_id, payload FROM events WHERE processed = 0 ORDER BY created_at')
+        .all() as unknown as UnprocessedEventRow[],
     'findAllUnprocessedEvents'
   )
 
@@ -216,7 +254,8 @@ export const markEventProcessed = (
   eventId: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       "UPDATE events SET processed = 1, processed_at = datetime('now') WHERE id = ?"
     ).run(eventId)
   }, 'markEventProcessed')
@@ -226,9 +265,29 @@ export const deleteSessionEvents = (
   sessionId: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('DELETE FROM events WHERE session_id = ?').run(sessionId)
+    prepare(db, 'DELETE FROM events WHERE session_id = ?').run(sessionId)
   }, 'deleteSessionEvents')
 
+/**
+ * Cheap change stamp for the database as seen by this connection.
+ * PRAGMA data_version moves when another connection commits; total_changes()
+ * counts rows written through this connection. The stamp only differs between
+ * two calls if something was written in between, so callers can skip
+ * re-querying unchanged tables.
+ */
+export const readChangeStamp = (
+  db: DatabaseSync
+): E.Either<DbError, string> =>
+  tryCatch(() => {
+    const version = prepare(db, 'PRAGMA data_version').get() as
+      | { data_version: number }
+      | undefined
+    const changes = prepare(db, 'SELECT total_changes() AS changes').get() as
+      | { changes: number }
+      | undefined
+    return `${version?.data_version ?? 0}:${changes?.changes ?? 0}`
+  }, 'readChangeStamp')
+
 // ============================================================================
 // Responses
 // ============================================================================
@@ -248,18 +307,41 @@ export const insertResponse = (
   payload: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       'INSERT INTO responses (id, event_id, payload) VALUES (?, ?, ?)'
     ).run(id, eventId, payload)
   }, 'insertResponse')
 
+/**
+ * Insert several responses in one transaction — a single commit (and WAL
+ * sync) for a whole batch instead of one per row. All rows or none.
+ */
+export const insertResponses = (
+  db: DatabaseSync,
+  rows: readonly { readonly id: string; readonly eventId: string; readonly payload: string }[]
+): E.Either<DbError, void> =>
+  tryCatch(() => {
+    const stmt = prepare(db, 'INSERT INTO responses (id, event_id, payload) VALUES (?, ?, ?)')
+    db.exec('BEGIN')
+    try {
+      for (const row of rows) {
+        stmt.run(row.id, row.eventId, row.payload)
+      }
+      db.exec('COMMIT')
+    } catch (err) {
+      db.exec('ROLLBACK')
+      throw err
+    }
+  }, 'insertResponses')
+
 export const findUnreadResponse = (
   db: DatabaseSync,
   eventId: string
 ): E.Either<DbError, ResponseRow | undefined> =>
   tryCatch(
     () =>
-      db.prepare('SELECT * FROM responses WHERE event_id = ? AND read = 0').get(eventId) as
+      prepare(db, 'SELECT * FROM responses WHERE event_id = ? AND read = 0').get(eventId) as
         | ResponseRow
         | undefined,
     'findUnreadResponse'
@@ -270,7 +352,7 @@ export const markResponseRead = (
   responseId: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('UPDATE responses SET read = 1 WHERE id = ?').run(responseId)
+    prepare(db, 'UPDATE responses SET read = 1 WHERE id = ?').run(responseId)
   }, 'markResponseRead')
 
 // ============================================================================
@@ -299,7 +381,8 @@ export const insertBatch = (
   slotNum: number
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       'INSERT INTO permission_batches (batch_id, session_id, slot_num) VALUES (?, ?, ?)'
     ).run(batchId, sessionId, slotNum)
   }, 'insertBatch')
@@ -310,7 +393,8 @@ export const addBatchItem = (
   eventId: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       'INSERT INTO permission_batch_items (batch_id, event_id) VALUES (?, ?)'
     ).run(batchId, eventId)
   }, 'addBatchItem')
@@ -321,8 +405,7 @@ export const findBufferingBatch = (
 ): E.Either<DbError, BatchRow | undefined> =>
   tryCatch(
     () =>
-      db
-        .prepare("SELECT * FROM permission_batches WHERE slot_num = ? AND status = 'buffering'")
+      prepare(db, "SELECT * FROM permission_batches WHERE slot_num = ? AND status = 'buffering'")
         .get(slotNum) as BatchRow | undefined,
     'findBufferingBatch'
   )
@@ -332,11 +415,10 @@ export const findFlushableBatches = (
   windowMs: number
 ): E.Either<DbError, readonly BatchRow[]> =>
   tryCatch(() => {
-    return db
-      .prepare(
-        "SELECT * FROM permission_batches WHERE status = 'buffering' AND created_at <= datetime('now', ?)"
-      )
-      .all(`-${windowMs / 1000} seconds`) as unknown as BatchRow[]
+    return prepare(
+      db,
+      "SELECT * FROM permission_batches WHERE status = 'buffering' AND created_at <= datetime('now', ?)"
+    ).all(`-${windowMs / 1000} seconds`) as unknown as BatchRow[]
   }, 'findFlushableBatches')
 
 export const flushBatch = (
@@ -345,7 +427,8 @@ export const flushBatch = (
   telegramMessageId: number
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       "UPDATE permission_batches SET status = 'flushed', flushed_at = datetime('now'), telegram_message_id = ? WHERE batch_id = ?"
     ).run(telegramMessageId, batchId)
   }, 'flushBatch')
@@ -355,11 +438,11 @@ export const resolveBatch = (
   batchId: string
 ): E.Either<DbError, readonly string[]> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       "UPDATE permission_batches SET status = 'resolved' WHERE batch_id = ?"
     ).run(batchId)
-    const items = db
-      .prepare('SELECT event_id FROM permission_batch_items WHERE batch_id = ?')
+    const items = prepare(db, 'SELECT event_id FROM permission_batch_items WHERE batch_id = ?')
       .all(batchId) as Array<{ event_id: string }>
     return items.map((i) => i.event_id)
   }, 'resolveBatch')
@@ -370,7 +453,7 @@ export const findBatchById = (
 ): E.Either<DbError, BatchRow | undefined> =>
   tryCatch(
     () =>
-      db.prepare('SELECT * FROM permission_batches WHERE batch_id = ?').get(batchId) as
+      prepare(db, 'SELECT * FROM permission_batches WHERE batch_id = ?').get(batchId) as
         | BatchRow
         | undefined,
     'findBatchById'
@@ -382,7 +465,7 @@ export const findBatchItems = (
 ): E.Either<DbError, readonly BatchItemRow[]> =>
   tryCatch(
     () =>
-      db.prepare('SELECT * FROM permission_batch_items WHERE batch_id = ?').all(batchId) as unknown as BatchItemRow[],
+      prepare(db, 'SELECT * FROM permission_batch_items WHERE batch_id = ?').all(batchId) as unknown as BatchItemRow[],
     'findBatchItems'
   )
 
@@ -404,7 +487,8 @@ export const insertPendingStop = (
   sessionId: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       'INSERT INTO pending_stops (event_id, session_id) VALUES (?, ?)'
     ).run(eventId, sessionId)
   }, 'insertPendingStop')
@@ -415,7 +499,7 @@ export const findPendingStopBySession = (
 ): E.Either<DbError, PendingStopRow | undefined> =>
   tryCatch(
     () =>
-      db.prepare('SELECT * FROM pending_stops WHERE session_id = ?').get(sessionId) as
+      prepare(db, 'SELECT * FROM pending_stops WHERE session_id = ?').get(sessionId) as
         | PendingStopRow
         | undefined,
     'findPendingStopBySession'
@@ -427,7 +511,7 @@ export const updatePendingStopTelegramId = (
   telegramMessageId: number
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('UPDATE pending_stops SET telegram_message_id = ? WHERE event_id = ?').run(
+    prepare(db, 'UPDATE pending_stops SET telegram_message_id = ? WHERE event_id = ?').run(
       telegramMessageId,
       eventId
     )
@@ -439,7 +523,7 @@ export const updateQueuedInstruction = (
   instruction: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('UPDATE pending_stops SET queued_instruction = ? WHERE event_id = ?').run(
+    prepare(db, 'UPDATE pending_stops SET queued_instruction = ? WHERE event_id = ?').run(
       instruction,
       eventId
     )
@@ -450,7 +534,7 @@ export const deletePendingStop = (
   eventId: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare('DELETE FROM pending_stops WHERE event_id = ?').run(eventId)
+    prepare(db, 'DELETE FROM pending_stops WHERE event_id = ?').run(eventId)
   }, 'deletePendingStop')
 
 // ============================================================================
@@ -470,7 +554,8 @@ export const insertKnownTopic = (
   topicName: string
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       'INSERT INTO known_topics (thread_id, topic_name) VALUES (?, ?)'
     ).run(threadId, topicName)
   }, 'insertKnownTopic')
@@ -480,7 +565,8 @@ export const markTopicDeleted = (
   threadId: number
 ): E.Either<DbError, void> =>
   tryCatch(() => {
-    db.prepare(
+    prepare(
+      db,
       "UPDATE known_topics SET deleted_at = datetime('now') WHERE thread_id = ?"
     ).run(threadId)
   }, 'markTopicDeleted')
@@ -490,6 +576,6 @@ export const findActiveTopics = (
 ): E.Either<DbError, readonly KnownTopicRow[]> =>
   tryCatch(
     () =>
-      db.prepare('SELECT * FROM known_topics WHERE deleted_at IS NULL ORDER BY thread_id').all() as unknown as KnownTopicRow[],
+      prepare(db, 'SELECT * FROM known_topics WHERE deleted_at IS NULL ORDER BY thread_id').all() as unknown as KnownTopicRow[],
     'findActiveTopics'
   )
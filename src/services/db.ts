@@ -1,4 +1,5 @@
 import { DatabaseSync } from 'node:sqlite'
+import * as fs from 'fs'
 import * as E from 'fp-ts/Either'
 import { DbError, connectionError } from '../types/db'
 
@@ -77,13 +78,19 @@ CREATE INDEX IF NOT EXISTS idx_sessions_slot
 
 let db: DatabaseSync | null = null
 
+/** Path and inode of the file-backed database currently open (null for :memory:) */
+let opened: { readonly path: string; readonly ino: number } | null = null
+
+/**
+ * Open (or reopen) the file-backed database. The new connection is fully
+ * set up before it replaces the current one, so a failed reopen leaves the
+ * previous connection in place — and isDatabaseReplaced() still true, so
+ * the daemon retries on its next iteration.
+ */
 export const openDatabase = (dbPath: string): E.Either<DbError, DatabaseSync> => {
+  let instance: DatabaseSync | null = null
   try {
-    if (db) {
-      db.close()
-      db = null
-    }
-    const instance = new DatabaseSync(dbPath, { enableForeignKeyConstraints: true, timeout: 5000 })
+    instance = new DatabaseSync(dbPath, { enableForeignKeyConstraints: true, timeout: 5000 })
     instance.exec('PRAGMA journal_mode = WAL')
 
     const version = (instance.prepare('PRAGMA user_version').get() as { user_version: number } | undefined)?.user_version ?? 0
@@ -91,20 +98,43 @@ export const openDatabase = (dbPath: string): E.Either<DbError, DatabaseSync> =>
       instance.exec(SCHEMA_SQL)
       instance.exec(`PRAGMA user_version = ${SCHEMA_VERSION}`)
     }
+    const ino = fs.statSync(dbPath).ino
 
+    if (db) db.close()
     db = instance
+    opened = { path: dbPath, ino }
     return E.right(instance)
   } catch (err) {
+    if (instance && instance !== db) {
+      try { instance.close() } catch { /* already unusable */ }
+    }
     return E.left(connectionError(err instanceof Error ? err.message : String(err)))
   }
 }
 
+/**
+ * True when the file at the opened database path is no longer the file this
+ * connection has open — deleted, or replaced by a new bridge.db. The
+ * connection would otherwise keep reading the orphaned inode and never see
+ * events written by hooks into the new file.
+ * Always false for in-memory databases or when nothing is open.
+ */
+export const isDatabaseReplaced = (): boolean => {
+  if (!db || !opened) return false
+  try {
+    return fs.statSync(opened.path).ino !== opened.ino
+  } catch {
+    return true
+  }
+}
+
 export const closeDatabase = (): E.Either<DbError, void> => {
   try {
     if (db) {
       db.close()
       db = null
     }
+    opened = null
     return E.right(undefined)
   } catch (err) {
     return E.left(connectionError(err instanceof Error ? err.message : String(err)))
@@ -124,6 +154,7 @@ export const openMemoryDatabase = (): E.Either<DbError, DatabaseSync> => {
     instance.exec(SCHEMA_SQL)
     instance.exec(`PRAGMA user_version = ${SCHEMA_VERSION}`)
     db = instance
+    opened = null
     return E.right(instance)
   } catch (err) {
     return E.left(connectionError(err instanceof Error ? err.message : String(err)))
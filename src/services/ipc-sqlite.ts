@@ -15,9 +15,11 @@ import {
   insertEvent,
   findUnprocessedEvents,
   findAllUnprocessedEvents,
+  readChangeStamp,
   markEventProcessed,
   deleteSessionEvents,
   insertResponse,
+  insertResponses,
   findUnreadResponse,
   markResponseRead,
   type EventRow,
@@ -136,6 +138,8 @@ export const readEventQueue = (
  * Used by the daemon to process events without directory scanning.
  *
  * Returns events grouped with their event row IDs for marking as processed.
+ * Only the columns needed for dispatch are selected, and rows are parsed in
+ * a single pass.
  */
 export const readAllUnprocessedEvents = (): TE.TaskEither<IpcError, Array<{ event: IpcEvent; eventRowId: string; sessionId: string }>> =>
   withDb(
@@ -143,16 +147,34 @@ export const readAllUnprocessedEvents = (): TE.TaskEither<IpcError, Array<{ even
     (db) => {
       const result = findAllUnprocessedEvents(db)
       if (E.isLeft(result)) return result
-      const parsed = result.right.map((row: EventRow) => ({
-        event: JSON.parse(row.payload) as IpcEvent,
-        eventRowId: row.id,
-        sessionId: row.session_id,
-      }))
+      const parsed: Array<{ event: IpcEvent; eventRowId: string; sessionId: string }> = []
+      for (const row of result.right) {
+        try {
+          parsed.push({
+            event: JSON.parse(row.payload) as IpcEvent,
+            eventRowId: row.id,
+            sessionId: row.session_id,
+          })
+        } catch {
+          // A corrupt payload must not block the rest of the queue —
+          // mark it processed so it is not re-read on every scan
+          console.warn(`[ipc-sqlite] Skipping event ${row.id} with malformed payload`)
+          markEventProcessed(db, row.id)
+        }
+      }
       return E.right(parsed)
     },
     toIpcReadError
   )
 
+/**
+ * Read the database change stamp (see db-queries readChangeStamp).
+ * The daemon compares stamps between ticks and only re-reads the events
+ * table when a hook or the daemon itself has written since the last scan.
+ */
+export const readEventsChangeStamp = (): TE.TaskEither<IpcError, string> =>
+  withDb('readEventsChangeStamp', readChangeStamp, toIpcReadError)
+
 /**
  * Mark a single event as processed by its row ID.
  */
@@ -227,6 +249,28 @@ export const writeResponse = (
   )
 }
 
+/**
+ * Write the same response for several events in one transaction
+ * (e.g. resolving a permission batch).
+ *
+ * @param _ipcDir - Ignored (file-based compat)
+ * @param eventIds - The event IDs to respond to
+ * @param response - JSON-serializable response payload
+ */
+export const writeResponses = (
+  _ipcDir: string,
+  eventIds: readonly string[],
+  response: Record<string, unknown>
+): TE.TaskEither<IpcError, void> => {
+  const now = Date.now()
+  const payload = JSON.stringify(response)
+  return withDb(
+    'writeResponses',
+    (db) => insertResponses(db, eventIds.map(eventId => ({ id: `resp-${eventId}-${now}`, eventId, payload }))),
+    toIpcWriteError
+  )
+}
+
 /**
  * Read a response for an event.
  * Returns null if no unread response exists.
@@ -0,0 +1,103 @@
+/**
+ * @module services/ipc-watcher
+ * Wakes the daemon loop as soon as a hook writes to the SQLite IPC database.
+ *
+ * Hooks commit events into bridge.db (WAL mode), which modifies bridge.db-wal
+ * in the config directory. fs.watch (inotify on Linux, FSEvents on macOS)
+ * turns those writes into an immediate wakeup, so the daemon no longer waits
+ * for the next polling tick to notice a new event. A fallback timeout keeps
+ * periodic work (batch flushes, typing indicators, cleanup) running when
+ * nothing is written, and on platforms where fs.watch is unavailable.
+ */
+
+import * as fs from 'fs'
+
+/**
+ * Handle returned by createIpcWatcher
+ */
+export interface IpcWatcher {
+  /** Resolve on the next database change or after timeoutMs, whichever comes first */
+  readonly wait: (timeoutMs: number) => Promise<void>
+  /** Wake a pending wait() immediately (or make the next wait() return at once) */
+  readonly wake: () => void
+  /** Stop watching and release any pending wait() */
+  readonly close: () => void
+}
+
+/**
+ * Files whose modification signals an IPC write for the given database name.
+ * The -shm file is excluded: readers touch it too, which would wake the
+ * daemon on its own queries.
+ */
+const watchedFileNames = (dbFileName: string): ReadonlySet<string> =>
+  new Set([dbFileName, `${dbFileName}-wal`, `${dbFileName}-journal`])
+
+/**
+ * Watch the config directory for writes to the IPC database.
+ *
+ * @param configDir - Directory containing bridge.db
+ * @param dbFileName - Database file name (default: bridge.db)
+ * @returns IpcWatcher
+ */
+export const createIpcWatcher = (
+  configDir: string,
+  dbFileName: string = 'bridge.db'
+): IpcWatcher => {
+  const fileNames = watchedFileNames(dbFileName)
+  let pending = false
+  let resolveWait: (() => void) | null = null
+  let waitTimer: NodeJS.Timeout | null = null
+
+  const wake = (): void => {
+    if (!resolveWait) {
+      pending = true
+      return
+    }
+    const resolve = resolveWait
+    resolveWait = null
+    if (waitTimer) {
+      clearTimeout(waitTimer)
+      waitTimer = null
+    }
+    resolve()
+  }
+
+  let watcher: fs.FSWatcher | null = null
+  try {
+    watcher = fs.watch(configDir, { persistent: false }, (_eventType, filename) => {
+      // filename may be null on some platforms — treat as a change
+      if (!filename || fileNames.has(String(filename))) {
+        wake()
+      }
+    })
+    watcher.on('error', () => {
+      watcher?.close()
+      watcher = null
+    })
+  } catch (error) {
+    console.warn(`[ipc-watcher] fs.watch unavailable, falling back to timed polling: ${String(error)}`)
+  }
+
+  const wait = (timeoutMs: number): Promise<void> => {
+    if (pending) {
+      pending = false
+      return Promise.resolve()
+    }
+    return new Promise(resolve => {
+      resolveWait = resolve
+      waitTimer = setTimeout(() => {
+        resolveWait = null
+        waitTimer = null
+        resolve()
+      }, timeoutMs)
+    })
+  }
+
+  const close = (): void => {
+    watcher?.close()
+    watcher = null
+    wake()
+  }
+
+  return { wait, wake, close }
+}
@@ -0,0 +1,108 @@
+/**
+ * @module services/send-queue
+ * Outbound Telegram send scheduler for the daemon.
+ *
+ * Sends for different topics run concurrently (up to a small limit) over the
+ * shared keep-alive pool, so a burst of notifications across sessions no
+ * longer waits for one HTTP round-trip after another. Sends for the same key
+ * (forum topic) still run strictly in order, so messages in a topic never
+ * arrive shuffled. Callers that need the API result (e.g. a message_id)
+ * await run(); notifications that need nothing back use enqueue().
+ */
+
+import * as E from 'fp-ts/Either'
+
+/** Ordering key — sends with the same key run one after another */
+export type SendKey = string | number
+
+/**
+ * Handle returned by createSendQueue
+ */
+export interface SendQueue {
+  /** Schedule task after earlier tasks with the same key; resolves with its result */
+  readonly run: <T>(key: SendKey, task: () => Promise<T>) => Promise<T>
+  /** Fire-and-forget variant of run(); thrown errors and Left results are logged */
+  readonly enqueue: (key: SendKey, task: () => Promise<unknown>) => void
+  /** Resolve once every scheduled task has settled */
+  readonly drain: () => Promise<void>
+}
+
+/** True for an fp-ts Left; tasks may resolve to anything */
+const isEitherLeft = (value: unknown): value is E.Left<unknown> =>
+  typeof value === 'object' && value !== null && E.isLeft(value as E.Either<unknown, unknown>)
+
+/** Concurrent sends across keys — well under Telegram's 30 msg/s limit */
+const DEFAULT_CONCURRENCY = 2
+
+/**
+ * Create a keyed, concurrency-limited send queue.
+ *
+ * @param concurrency - Maximum tasks in flight across all keys
+ * @returns SendQueue
+ */
+export const createSendQueue = (concurrency: number = DEFAULT_CONCURRENCY): SendQueue => {
+  const tails = new Map<SendKey, Promise<unknown>>()
+  const waiters: Array<() => void> = []
+  let active = 0
+
+  const acquire = (): Promise<void> => {
+    if (active < concurrency) {
+      active++
+      return Promise.resolve()
+    }
+    return new Promise(resolve => waiters.push(resolve))
+  }
+
+  const release = (): void => {
+    const next = waiters.shift()
+    if (next) {
+      // Hand the slot straight to the next waiter
+      next()
+    } else {
+      active--
+    }
+  }
+
+  const run = <T>(key: SendKey, task: () => Promise<T>): Promise<T> => {
+    const previous = tails.get(key) ?? Promise.resolve()
+    const result = previous
+      .catch(() => {})
+      .then(async () => {
+        await acquire()
+        try {
+          return await task()
+        } finally {
+          release()
+        }
+      })
+
+    tails.set(key, result)
+    const forget = (): void => {
+      if (tails.get(key) === result) tails.delete(key)
+    }
+    result.then(forget, forget)
+    return result
+  }
+
+  const enqueue = (key: SendKey, task: () => Promise<unknown>): void => {
+    run(key, task).then(
+      result => {
+        // Telegram API failures resolve to E.left rather than rejecting
+        if (isEitherLeft(result)) {
+          console.error(`[send-queue] Send for ${String(key)} failed: ${String(result.left)}`)
+        }
+      },
+      error => {
+        console.error(`[send-queue] Send for ${String(key)} failed: ${String(error)}`)
+      }
+    )
+  }
+
+  const drain = async (): Promise<void> => {
+    while (tails.size > 0) {
+      await Promise.allSettled([...tails.values()])
+    }
+  }
+
+  return { run, enqueue, drain }
+}
@@ -1,6 +1,7 @@
 import * as TE from 'fp-ts/TaskEither'
 import * as E from 'fp-ts/Either'
 import { Config } from '../types/config'
+import { callTelegramApi } from './telegram'
 
 /**
  * Telegram update with message
@@ -43,52 +44,45 @@ export const pollerError = (msg: string): PollerError => ({
 
 /**
  * Long poll Telegram for updates
- * Returns new updates since last offset
+ * Returns new updates since last offset.
+ * Uses the shared Bot API client so the poll reuses the same keep-alive
+ * connection pool as outbound sends. The pool opens an extra socket per
+ * in-flight request, so a blocked long-poll never holds up a concurrent
+ * sendMessage; the poll gets its own abort budget (server timeout + 5s)
+ * instead of the short per-request budget used for sends.
+ * Pass a signal to cancel an in-flight long-poll (e.g. on shutdown).
  */
 export const pollTelegram = (
   config: Config,
   offset: number,
-  timeoutSeconds: number = 2
+  timeoutSeconds: number = 2,
+  signal?: AbortSignal
 ): TE.TaskEither<PollerError, { updates: readonly TelegramUpdate[]; nextOffset: number }> => {
   return TE.tryCatch(
     async () => {
-      const url = `https://api.telegram.org/bot${config.telegramBotToken}/getUpdates`
-      const params = new URLSearchParams({
-        offset: String(offset),
-        timeout: String(timeoutSeconds),
-        allowed_updates: JSON.stringify(['message', 'callback_query'])
-      })
+      const result = await callTelegramApi(
+        config.telegramBotToken,
+        'getUpdates',
+        {
+          offset,
+          timeout: timeoutSeconds,
+          allowed_updates: ['message', 'callback_query']
+        },
+        (timeoutSeconds + 5) * 1000,
+        signal
+      )()
 
-      const controller = new AbortController()
-      const timeoutId = setTimeout(() => controller.abort(), (timeoutSeconds + 5) * 1000)
-
-      try {
-        const response = await fetch(`${url}?${params}`, {
-          method: 'GET',
-          signal: controller.signal
-        })
-
-        const data = (await response.json()) as {
-          ok: boolean
-          result?: TelegramUpdate[]
-          error_code?: number
-          description?: string
-        }
-
-        if (!data.ok) {
-          throw new Error(`Telegram API error: ${data.description || 'Unknown error'}`)
-        }
+      if (E.isLeft(result)) {
+        throw result.left
+      }
 
-        const updates = data.result || []
-        const lastUpdate = updates.length > 0 ? updates[updates.length - 1] : undefined
-        const nextOffset = lastUpdate ? lastUpdate.update_id + 1 : offset
+      const updates = (result.right.result as TelegramUpdate[] | undefined) || []
+      const lastUpdate = updates.length > 0 ? updates[updates.length - 1] : undefined
+      const nextOffset = lastUpdate ? lastUpdate.update_id + 1 : offset
 
-        return {
-          updates: updates as readonly TelegramUpdate[],
-          nextOffset
-        }
-      } finally {
-        clearTimeout(timeoutId)
+      return {
+        updates: updates as readonly TelegramUpdate[],
+        nextOffset
       }
     },
     (error) =>
@@ -2,6 +2,13 @@
  * @module services/telegram
  * Telegram Bot API client service using fp-ts TaskEither for async error handling.
  * Wraps Telegram Bot API calls with functional error handling.
+ *
+ * Every Bot API method (including getUpdates) goes through callTelegramApi so
+ * all requests share Node's global fetch dispatcher — a keep-alive connection
+ * pool for api.telegram.org — instead of paying a new TCP+TLS handshake per
+ * request. Sharing the pool does not mean sharing one socket: an idle socket
+ * is reused when there is one, and a request arriving while every pooled
+ * socket is busy (e.g. behind a pending long-poll) gets a socket of its own.
  */
 
 import * as TE from 'fp-ts/TaskEither'
@@ -9,6 +16,8 @@ import * as TE from 'fp-ts/TaskEither'
 // Module constants
 const TELEGRAM_API_BASE_URL = 'https://api.telegram.org'
 const CONTENT_TYPE_JSON = 'application/json'
+/** Per-request budget for regular (non long-poll) API calls */
+const DEFAULT_REQUEST_TIMEOUT_MS = 15_000
 
 /**
  * Convert an unknown error to a standardized Error instance
@@ -62,28 +71,48 @@ const getResponseError = (
 }
 
 /**
- * Generic Telegram Bot API caller
+ * Generic Telegram Bot API caller.
+ * The response body is always consumed so the underlying keep-alive socket is
+ * returned to the pool; a stalled request is aborted after timeoutMs so it
+ * cannot pin a pooled connection indefinitely. An optional caller signal
+ * aborts the request early (e.g. a long-poll on daemon shutdown).
  */
 export const callTelegramApi = (
   botToken: string,
   method: string,
-  body: Record<string, unknown>
+  body: Record<string, unknown>,
+  timeoutMs: number = DEFAULT_REQUEST_TIMEOUT_MS,
+  signal?: AbortSignal
 ): TE.TaskEither<Error, TelegramApiResponse> => {
   return TE.tryCatch(
     async () => {
       const url = buildTelegramUrl(botToken, method)
-      const response = await fetch(url, {
-        method: 'POST',
-        headers: { 'Content-Type': CONTENT_TYPE_JSON },
-        body: JSON.stringify(body)
-      })
+      const controller = new AbortController()
+      const timeoutId = setTimeout(() => controller.abort(), timeoutMs)
+      const onAbort = (): void => controller.abort()
+      if (signal?.aborted) {
+        controller.abort()
+      }
+      signal?.addEventListener('abort', onAbort, { once: true })
+
+      try {
+        const response = await fetch(url, {
+          method: 'POST',
+          headers: { 'Content-Type': CONTENT_TYPE_JSON },
+          body: JSON.stringify(body),
+          signal: controller.signal
+        })
 
-      const data = (await response.json()) as TelegramApiResponse
-      const error = getResponseError(response.status, data)
-      if (error) {
-        throw new Error(error)
+        const data = (await response.json()) as TelegramApiResponse
+        const error = getResponseError(response.status, data)
+        if (error) {
+          throw new Error(error)
+        }
+        return data
+      } finally {
+        clearTimeout(timeoutId)
+        signal?.removeEventListener('abort', onAbort)
       }
-      return data
     },
     convertError
   )
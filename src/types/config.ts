@@ -7,4 +7,5 @@ export interface Config {
   readonly autoApprovePaths?: readonly string[]
   readonly permissionBatchWindowMs?: number     // default: 2000
   readonly sessionTrustThreshold?: number       // default: 3
+  readonly pollTimeoutSeconds?: number          // default: 30, clamped to 1-50 (getUpdates long-poll)
 }